@@ -1,30 +1,39 @@
+from datetime import datetime
 from typing import cast
 
-from django.db.models import Max
-from django.db.models import Q
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core import signing
+from django.db import transaction
+from django.db.models import QuerySet
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from ninja import Router
+from ninja.errors import ValidationError
 
-from content.models import Follow
+from content.graph import mutual_followers
 from project.schemas import GenericResponse
 from users.auth import JWTAuth
 from users.models import User
 
+from .chatting import broadcast_message
+from .models import Conversation
 from .models import Message
 from .schemas import ConversationOut
+from .schemas import ConversationPageSchema
 from .schemas import MessageIn
 from .schemas import MessageModelSchema
 
+MAX_HISTORY_PAGE_SIZE = 100
+MAX_CONVERSATION_PAGE_SIZE = 100
+CONVERSATION_CURSOR_SALT = "chat.conversations.cursor"
+
 auth = JWTAuth()
 chat_router = Router(tags=["Chat"])
 
 
 def are_mutual_followers(user1: User, user2: User) -> bool:
-    return (
-        Follow.objects.filter(follower=user1, following=user2).exists()
-        and Follow.objects.filter(follower=user2, following=user1).exists()
-    )
+    return mutual_followers(user1.id, user2.id)
 
 
 @chat_router.post(
@@ -42,14 +51,33 @@ def send_message(request: HttpRequest, payload: MessageIn):
     if sender != receiver and not are_mutual_followers(sender, receiver):
         return 403, GenericResponse(error="Users are not mutual followers.")
 
-    return Message.objects.create(
-        sender=sender,
-        receiver=receiver,
-        content=payload.content,
+    with transaction.atomic():
+        message = Message.objects.create(
+            conversation=Conversation.objects.for_pair(sender.id, receiver.id),
+            sender=sender,
+            receiver=receiver,
+            content=payload.content,
+        )
+        Conversation.objects.record([message])
+    async_to_sync(broadcast_message)(get_channel_layer(), message)
+    return message
+
+
+def _conversation_messages(user: User, other_user: User) -> QuerySet[Message]:
+    conversation_id = (
+        Conversation.objects.between(user.id, other_user.id)
+        .values_list("id", flat=True)
+        .first()
     )
+    return Message.objects.filter(conversation_id=conversation_id)
 
 
-@chat_router.get("/history/", response=list[MessageModelSchema], auth=auth)
+@chat_router.get(
+    "/history/",
+    response=list[MessageModelSchema],
+    auth=auth,
+    deprecated=True,
+)
 def conversation_history(
     request: HttpRequest,
     with_user_id: str,
@@ -59,54 +87,124 @@ def conversation_history(
     user = cast(User, request.user)
     other_user = get_object_or_404(User, id=with_user_id)
 
-    qs = Message.objects.filter(
-        Q(sender=user, receiver=other_user)
-        | Q(sender=other_user, receiver=user)
-    ).order_by("-created_at")[offset : offset + limit]
-    return qs
+    qs = _conversation_messages(user, other_user).order_by("-id")
+    return qs[offset : offset + limit]
 
 
-@chat_router.get("/conversations/", response=list[ConversationOut], auth=auth)
+@chat_router.get(
+    "/history/page/", response=list[MessageModelSchema], auth=auth
+)
+def conversation_history_page(
+    request: HttpRequest,
+    with_user_id: str,
+    limit: int = 20,
+    before_id: int | None = None,
+    after_id: int | None = None,
+):
+    """Newest first. Page back with ``before_id`` set to the oldest id
+    received, or catch up with ``after_id`` set to the newest one."""
+    user = cast(User, request.user)
+    other_user = get_object_or_404(User, id=with_user_id)
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+
+    # ids follow insertion order, so they double as the (conversation,
+    # created_at) cursor and every page is one index range scan
+    qs = _conversation_messages(user, other_user)
+    if after_id is not None:
+        return list(qs.filter(id__gt=after_id).order_by("id")[:limit])[::-1]
+    if before_id is not None:
+        qs = qs.filter(id__lt=before_id)
+    return qs.order_by("-id")[:limit]
+
+
+def _encode_cursor(last_message_at: datetime, conversation_id: int) -> str:
+    return signing.dumps(
+        [last_message_at.isoformat(), conversation_id],
+        salt=CONVERSATION_CURSOR_SALT,
+    )
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        last_message_at, conversation_id = signing.loads(
+            cursor, salt=CONVERSATION_CURSOR_SALT
+        )
+        return datetime.fromisoformat(last_message_at), int(conversation_id)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise ValidationError([{"detail": "Invalid cursor"}])
+
+
+def _conversation_out(
+    user: User, conversation: Conversation
+) -> ConversationOut:
+    other_user = conversation.other_user(user.id)
+    return ConversationOut(
+        conversation_id=conversation.id,
+        user_id=str(other_user.id),
+        username=other_user.username or str(other_user.id),
+        last_message=conversation.last_message.content,
+        last_timestamp=conversation.last_message.created_at,
+        profile_url=other_user.profile_picture,
+        unread_count=conversation.unread_for(user.id),
+    )
+
+
+@chat_router.get(
+    "/conversations/",
+    response=list[ConversationOut],
+    auth=auth,
+    deprecated=True,
+)
 def list_conversations(
     request: HttpRequest,
     limit: int = 20,
     offset: int = 0,
 ):
     user = cast(User, request.user)
-    qs = (
-        Message.objects.filter(Q(sender=user) | Q(receiver=user))
-        .values("sender", "receiver")
-        .annotate(last_timestamp=Max("created_at"))
-        .order_by("-last_timestamp")
+    conversations = Conversation.objects.recent_for_user(
+        user.id, limit, offset=offset
     )
+    return [
+        _conversation_out(user, conversation) for conversation in conversations
+    ]
 
-    seen: set[str] = set()
-    conversations: list[ConversationOut] = []
-    for row in qs:
-        other_id = (
-            row["receiver"] if row["sender"] == user.id else row["sender"]
-        )
-        if other_id in seen:
-            continue
-        seen.add(other_id)
-        other_user = User.objects.get(id=other_id)
-        last_msg = (
-            Message.objects.filter(
-                Q(sender=user, receiver=other_user)
-                | Q(sender=other_user, receiver=user)
-            )
-            .order_by("-created_at")
-            .first()
-        )
-        if last_msg:
-            conversations.append(
-                ConversationOut(
-                    user_id=str(other_user.id),
-                    username=other_user.username or str(other_id),
-                    last_message=last_msg.content,
-                    last_timestamp=last_msg.created_at,
-                    profile_url=other_user.profile_picture,
-                )
-            )
-
-    return conversations[offset : offset + limit]
+
+@chat_router.get(
+    "/conversations/page/", response=ConversationPageSchema, auth=auth
+)
+def list_conversations_page(
+    request: HttpRequest,
+    count: int = 20,
+    cursor: str | None = None,
+):
+    user = cast(User, request.user)
+    count = max(1, min(count, MAX_CONVERSATION_PAGE_SIZE))
+    conversations = Conversation.objects.recent_for_user(
+        user.id,
+        count + 1,
+        before=_decode_cursor(cursor) if cursor else None,
+    )
+    page = conversations[:count]
+    last = page[-1] if page else None
+    return ConversationPageSchema(
+        conversations=[
+            _conversation_out(user, conversation) for conversation in page
+        ],
+        next_cursor=(
+            _encode_cursor(last.last_message_at, last.id)
+            if last is not None
+            and last.last_message_at is not None
+            and len(conversations) > count
+            else None
+        ),
+    )
+
+
+@chat_router.post(
+    "/conversations/{user_id}/read/", response=GenericResponse, auth=auth
+)
+def mark_conversation_read(request: HttpRequest, user_id: str):
+    user = cast(User, request.user)
+    other_user = get_object_or_404(User, id=user_id)
+    marked = Conversation.objects.mark_read(user.id, other_user.id)
+    return GenericResponse(detail=f"Marked {marked} messages as read.")
@@ -1,32 +1,113 @@
 import json
+from functools import partial
 from typing import Any
-from typing import cast
 from uuid import UUID
 
+from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 
+from content.graph import mutual_followers
 from content.models import Follow
 from users.models import User
 
+from .models import Conversation
 from .models import Message
+from .writer import message_writer
+
+
+def room_name(user1_id: UUID, user2_id: UUID) -> str:
+    return f"chat_{min(user1_id, user2_id)}_{max(user1_id, user2_id)}"
+
+
+def user_group(user_id: UUID) -> str:
+    return f"user_{user_id}"
+
+
+def compact(frame: dict[str, Any]) -> str:
+    return json.dumps(frame, separators=(",", ":"))
+
+
+async def broadcast_message(channel_layer: Any, message: Message) -> None:
+    """Deliver a saved message to its pair's room and both users' inboxes."""
+    await channel_layer.group_send(
+        room_name(message.sender_id, message.receiver_id),
+        {
+            "type": "chat_message",
+            "message": {
+                "id": message.id,
+                "sender_id": str(message.sender_id),
+                "receiver_id": str(message.receiver_id),
+                "content": message.content,
+                "created_at": message.created_at.isoformat(),
+                "read": message.read,
+            },
+        },
+    )
+    event = {
+        "type": "inbox_frame",
+        "frame": compact(
+            {
+                "t": "m",
+                "c": message.conversation_id,
+                "i": message.id,
+                "s": str(message.sender_id),
+                "b": message.content,
+                "at": message.created_at.isoformat(),
+            }
+        ),
+    }
+    for user_id in {message.sender_id, message.receiver_id}:
+        await channel_layer.group_send(user_group(user_id), event)
+
+
+def follow_removed(follower_id: UUID, following_id: UUID) -> None:
+    """Tell open sockets between the pair to check their permission again."""
+    channel_layer = get_channel_layer()
+    event = {
+        "type": "follow_removed",
+        "users": [str(follower_id), str(following_id)],
+    }
+    for group in (
+        user_group(follower_id),
+        user_group(following_id),
+        room_name(follower_id, following_id),
+    ):
+        async_to_sync(channel_layer.group_send)(group, event)
+
+
+@receiver(post_delete, sender=Follow)
+def _follow_deleted(sender: type[Follow], instance: Follow, **kwargs: Any):
+    transaction.on_commit(
+        lambda: follow_removed(instance.follower_id, instance.following_id)
+    )
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     user: User
     other_user_id: UUID
+    conversation_id: int
+    connected: bool = False
     room_name: str
     scope: Any
 
     async def connect(self) -> None:
         self.user: User = self.scope["user"]
-        self.other_user_id: UUID = cast(
-            UUID, self.scope["url_route"]["kwargs"]["user_id"]
-        )
-        self.room_name: str = (
-            f"chat_{min(self.user.id, self.other_user_id)}_"
-            f"{max(self.user.id, self.other_user_id)}"
-        )
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+        try:
+            self.other_user_id: UUID = UUID(
+                self.scope["url_route"]["kwargs"]["user_id"]
+            )
+        except ValueError:
+            await self.close()
+            return
+        self.room_name: str = room_name(self.user.id, self.other_user_id)
 
         if not await self.are_mutual_followers(
             self.user.id, self.other_user_id
@@ -34,10 +115,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        self.conversation_id: int = await self.get_conversation_id(
+            self.user.id, self.other_user_id
+        )
+        self.connected = True
         await self.channel_layer.group_add(self.room_name, self.channel_name)
-        await self.accept()
+        await self.accept(self.scope.get("auth_subprotocol"))
 
     async def disconnect(self, code: int) -> None:
+        self.connected = False
         await self.channel_layer.group_discard(
             self.room_name, self.channel_name
         )
@@ -57,46 +143,244 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 pass
         data: dict[str, Any] = json.loads(_data)
         content: str = data.get("content", "")[:1500]
+        client_id: str | None = data.get("client_id")
 
-        message: Message = await self.create_message(
-            self.user.id, self.other_user_id, content
+        message = Message(
+            conversation_id=self.conversation_id,
+            sender_id=self.user.id,
+            receiver_id=self.other_user_id,
+            content=content,
         )
+        message_writer.submit(
+            message,
+            on_saved=partial(self.message_saved, client_id),
+            on_failed=partial(self.message_failed, client_id),
+        )
+
+    async def message_saved(
+        self, client_id: str | None, message: Message
+    ) -> None:
+        await broadcast_message(self.channel_layer, message)
+        if client_id is not None and self.connected:
+            await self.send(
+                text_data=json.dumps(
+                    {"type": "ack", "client_id": client_id, "id": message.id}
+                )
+            )
+
+    async def message_failed(
+        self, client_id: str | None, message: Message
+    ) -> None:
+        if self.connected:
+            await self.send(
+                text_data=json.dumps(
+                    {
+                        "type": "error",
+                        "client_id": client_id,
+                        "error": "Message could not be saved.",
+                    }
+                )
+            )
 
+    async def chat_message(self, event: dict[str, Any]) -> None:
+        await self.send(text_data=json.dumps(event["message"]))
+
+    async def follow_removed(self, event: dict[str, Any]) -> None:
+        if self.connected and not await self.are_mutual_followers(
+            self.user.id, self.other_user_id
+        ):
+            await self.close()
+
+    @database_sync_to_async
+    def get_conversation_id(self, user1_id: UUID, user2_id: UUID) -> int:
+        return Conversation.objects.for_pair(user1_id, user2_id).id
+
+    @database_sync_to_async
+    def are_mutual_followers(self, user1_id: UUID, user2_id: UUID) -> bool:
+        return mutual_followers(user1_id, user2_id)
+
+
+class InboxConsumer(AsyncWebsocketConsumer):
+    """One socket per user for all of their conversations.
+
+    Frames are compact JSON objects tagged by ``t``. Clients send
+    ``m`` {c or u, b, k} to post a message, ``y`` {c} while typing and
+    ``r`` {c} once they have read a conversation. The server sends
+    ``m`` {c, i, s, b, at} for new messages, ``a`` {k, i, c} to acknowledge
+    the client's message ``k``, ``y`` and ``r`` {c, s} for the other
+    user's typing and read events, and ``e`` {k, e} for errors.
+    """
+
+    user: User
+    group_name: str
+    # conversation id -> the other user, for conversations already checked
+    peers: dict[int, UUID]
+    conversation_ids: dict[UUID, int]
+    connected: bool = False
+    scope: Any
+
+    async def connect(self) -> None:
+        self.user = self.scope["user"]
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = user_group(self.user.id)
+        self.peers = {}
+        self.conversation_ids = {}
+        self.connected = True
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept(self.scope.get("auth_subprotocol"))
+
+    async def disconnect(self, code: int) -> None:
+        if self.connected:
+            self.connected = False
+            await self.channel_layer.group_discard(
+                self.group_name, self.channel_name
+            )
+
+    async def receive(
+        self,
+        text_data: str | None = None,
+        bytes_data: bytes | None = None,
+    ) -> None:
+        try:
+            data: dict[str, Any] = json.loads(text_data or bytes_data or "")
+        except ValueError:
+            await self.send_error(None, "Malformed frame.")
+            return
+        if not isinstance(data, dict):
+            await self.send_error(None, "Malformed frame.")
+            return
+        client_id: str | None = data.get("k")
+        peer = await self.resolve(data.get("c"), data.get("u"))
+        if peer is None:
+            await self.send_error(client_id, "Unknown conversation.")
+            return
+        conversation_id, other_user_id = peer
+
+        kind = data.get("t")
+        if kind == "m":
+            message = Message(
+                conversation_id=conversation_id,
+                sender_id=self.user.id,
+                receiver_id=other_user_id,
+                content=str(data.get("b", ""))[:1500],
+            )
+            message_writer.submit(
+                message,
+                on_saved=partial(self.message_saved, client_id),
+                on_failed=partial(self.message_failed, client_id),
+            )
+        elif kind == "y":
+            await self.notify(other_user_id, "y", conversation_id)
+        elif kind == "r":
+            await self.mark_read(other_user_id)
+            await self.notify(other_user_id, "r", conversation_id)
+        else:
+            await self.send_error(client_id, "Unknown frame type.")
+
+    async def resolve(
+        self, conversation_id: Any, other_user_id: Any
+    ) -> tuple[int, UUID] | None:
+        if conversation_id in self.peers:
+            return conversation_id, self.peers[conversation_id]
+        try:
+            if conversation_id is not None:
+                conversation_id = int(conversation_id)
+            elif other_user_id is not None:
+                other_user_id = UUID(str(other_user_id))
+                if other_user_id in self.conversation_ids:
+                    conversation_id = self.conversation_ids[other_user_id]
+                    return conversation_id, other_user_id
+            else:
+                return None
+        except (TypeError, ValueError):
+            return None
+
+        peer = await self.open_conversation(conversation_id, other_user_id)
+        if peer is not None:
+            self.peers[peer[0]] = peer[1]
+            self.conversation_ids[peer[1]] = peer[0]
+        return peer
+
+    async def notify(
+        self, user_id: UUID, kind: str, conversation_id: int
+    ) -> None:
         await self.channel_layer.group_send(
-            self.room_name,
+            user_group(user_id),
             {
-                "type": "chat_message",
-                "message": {
-                    "id": message.id,
-                    "sender_id": message.sender.id,
-                    "receiver_id": message.receiver.id,
-                    "content": message.content,
-                    "created_at": message.created_at.isoformat(),
-                    "read": message.read,
-                },
+                "type": "inbox_frame",
+                "frame": compact(
+                    {"t": kind, "c": conversation_id, "s": str(self.user.id)}
+                ),
             },
         )
 
-    async def chat_message(self, event: dict[str, Any]) -> None:
-        await self.send(text_data=json.dumps(event["message"]))
+    async def send_error(self, client_id: str | None, error: str) -> None:
+        if self.connected:
+            await self.send(
+                text_data=compact({"t": "e", "k": client_id, "e": error})
+            )
+
+    async def message_saved(
+        self, client_id: str | None, message: Message
+    ) -> None:
+        await broadcast_message(self.channel_layer, message)
+        if client_id is not None and self.connected:
+            await self.send(
+                text_data=compact(
+                    {
+                        "t": "a",
+                        "k": client_id,
+                        "i": message.id,
+                        "c": message.conversation_id,
+                    }
+                )
+            )
+
+    async def message_failed(
+        self, client_id: str | None, message: Message
+    ) -> None:
+        await self.send_error(client_id, "Message could not be saved.")
+
+    async def inbox_frame(self, event: dict[str, Any]) -> None:
+        await self.send(text_data=event["frame"])
+
+    async def follow_removed(self, event: dict[str, Any]) -> None:
+        # the next frame for these conversations checks the follows again
+        for user_id in map(UUID, event["users"]):
+            conversation_id = self.conversation_ids.pop(user_id, None)
+            if conversation_id is not None:
+                self.peers.pop(conversation_id, None)
 
     @database_sync_to_async
-    def create_message(
-        self, sender_id: UUID, receiver_id: UUID, content: str
-    ) -> Message:
-        sender: User = User.objects.get(id=sender_id)
-        receiver: User = User.objects.get(id=receiver_id)
-        return Message.objects.create(
-            sender=sender, receiver=receiver, content=content
+    def open_conversation(
+        self, conversation_id: int | None, other_user_id: UUID | None
+    ) -> tuple[int, UUID] | None:
+        if conversation_id is not None:
+            pair = (
+                Conversation.objects.for_user(self.user.id)
+                .filter(id=conversation_id)
+                .values_list("user_a_id", "user_b_id")
+                .first()
+            )
+            if pair is None:
+                return None
+            user_a_id, user_b_id = pair
+            other_user_id = (
+                user_b_id if user_a_id == self.user.id else user_a_id
+            )
+        if other_user_id is None or not mutual_followers(
+            self.user.id, other_user_id
+        ):
+            return None
+        if conversation_id is not None:
+            return conversation_id, other_user_id
+        conversation = Conversation.objects.for_pair(
+            self.user.id, other_user_id
         )
+        return conversation.id, other_user_id
 
     @database_sync_to_async
-    def are_mutual_followers(self, user1_id: UUID, user2_id: UUID) -> bool:
-        return (
-            Follow.objects.filter(
-                follower_id=user1_id, following_id=user2_id
-            ).exists()
-            and Follow.objects.filter(
-                follower_id=user2_id, following_id=user1_id
-            ).exists()
-        )
+    def mark_read(self, other_user_id: UUID) -> None:
+        Conversation.objects.mark_read(self.user.id, other_user_id)
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Message = apps.get_model('chat', 'Message')
+    Conversation = apps.get_model('chat', 'Conversation')
+    conversations = {}
+    for id, sender_id, receiver_id, created_at, read in (
+        Message.objects.order_by('id')
+        .values_list('id', 'sender_id', 'receiver_id', 'created_at', 'read')
+        .iterator(chunk_size=10000)
+    ):
+        user_a_id, user_b_id = sorted((sender_id, receiver_id))
+        conversation = conversations.get((user_a_id, user_b_id))
+        if conversation is None:
+            conversation = conversations[user_a_id, user_b_id] = Conversation(
+                user_a_id=user_a_id, user_b_id=user_b_id
+            )
+        conversation.last_message_id = id
+        conversation.last_message_at = created_at
+        if not read and sender_id != receiver_id:
+            if receiver_id == user_a_id:
+                conversation.unread_a += 1
+            else:
+                conversation.unread_b += 1
+    Conversation.objects.bulk_create(conversations.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_a', models.PositiveIntegerField(default=0)),
+                ('unread_b', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.message')),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['user_a', '-last_message_at'], name='chat_conver_user_a__f60a68_idx'), models.Index(fields=['user_b', '-last_message_at'], name='chat_conver_user_b__b07d0c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_a', 'user_b'), name='unique_conversation_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
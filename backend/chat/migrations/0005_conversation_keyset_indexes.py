@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_message_conversation_required'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='chat_conver_user_a__f60a68_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='chat_conver_user_b__b07d0c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_a', '-last_message_at', '-id'], name='chat_conver_user_a__9e77df_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_b', '-last_message_at', '-id'], name='chat_conver_user_b__9f62e2_idx'),
+        ),
+    ]
@@ -1,10 +1,27 @@
+import heapq
+from collections import Counter
+from collections import defaultdict
+from datetime import datetime
+from typing import Sequence
+from uuid import UUID
+
 from django.db import models
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
 
 from core.models import BaseModel
 from users.models import User
 
 
 class Message(BaseModel):
+    conversation: models.ForeignKey["Conversation", "Conversation"] = (
+        models.ForeignKey(
+            "Conversation", on_delete=models.CASCADE, related_name="messages"
+        )
+    )
     sender: models.ForeignKey[User, User] = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="sent_messages"
     )
@@ -18,7 +35,182 @@ class Message(BaseModel):
         ordering = ["created_at"]
         indexes = [
             models.Index(fields=["sender", "receiver", "created_at"]),
+            models.Index(fields=["conversation", "id"]),
         ]
 
     def __str__(self) -> str:
         return f"{self.sender} → {self.receiver}: {self.content[:20]}"
+
+
+def conversation_key(user1_id: UUID, user2_id: UUID) -> tuple[UUID, UUID]:
+    return (
+        (user1_id, user2_id) if user1_id <= user2_id else (user2_id, user1_id)
+    )
+
+
+class ConversationManager(models.Manager["Conversation"]):
+    def for_user(self, user_id: UUID) -> models.QuerySet["Conversation"]:
+        return self.filter(Q(user_a_id=user_id) | Q(user_b_id=user_id))
+
+    def recent_for_user(
+        self,
+        user_id: UUID,
+        limit: int,
+        offset: int = 0,
+        before: tuple[datetime, int] | None = None,
+    ) -> list["Conversation"]:
+        """Conversations with messages, newest first, older than ``before``.
+
+        An OR across user_a and user_b can't be served by either index, so
+        each side is read as its own range scan and the two are merged.
+        """
+        pages: list[list[Conversation]] = []
+        for side in ("user_a_id", "user_b_id"):
+            qs = self.filter(
+                **{side: user_id},
+                last_message_at__isnull=False,
+                last_message__isnull=False,
+            )
+            if before is not None:
+                last_message_at, conversation_id = before
+                qs = qs.filter(
+                    Q(last_message_at__lt=last_message_at)
+                    | Q(
+                        last_message_at=last_message_at, id__lt=conversation_id
+                    )
+                )
+            pages.append(
+                list(
+                    qs.select_related(
+                        "user_a", "user_b", "last_message"
+                    ).order_by("-last_message_at", "-id")[: offset + limit]
+                )
+            )
+        # a conversation with oneself shows up on both sides
+        merged = {
+            conversation.id: conversation
+            for conversation in heapq.merge(
+                *pages,
+                key=lambda conversation: (
+                    conversation.last_message_at,
+                    conversation.id,
+                ),
+                reverse=True,
+            )
+        }
+        return list(merged.values())[offset : offset + limit]
+
+    def between(
+        self, user1_id: UUID, user2_id: UUID
+    ) -> models.QuerySet["Conversation"]:
+        user_a_id, user_b_id = conversation_key(user1_id, user2_id)
+        return self.filter(user_a_id=user_a_id, user_b_id=user_b_id)
+
+    def for_pair(self, user1_id: UUID, user2_id: UUID) -> "Conversation":
+        user_a_id, user_b_id = conversation_key(user1_id, user2_id)
+        conversation, _ = self.get_or_create(
+            user_a_id=user_a_id, user_b_id=user_b_id
+        )
+        return conversation
+
+    def record(self, messages: Sequence[Message]) -> None:
+        """Move each conversation to its newest message and count the rest
+        as unread by their receivers."""
+        batches: defaultdict[int, list[Message]] = defaultdict(list)
+        for message in messages:
+            batches[message.conversation_id].append(message)
+        for conversation_id, batch in batches.items():
+            latest = max(batch, key=lambda message: message.id)
+            # compare ids, not timestamps, so concurrent sends settle on the
+            # message that was inserted last
+            newer = Q(last_message__isnull=True) | Q(
+                last_message__lt=latest.id
+            )
+            changes = {
+                "last_message": Case(
+                    When(newer, then=Value(latest.id)),
+                    default=F("last_message"),
+                    output_field=models.BigIntegerField(),
+                ),
+                "last_message_at": Case(
+                    When(newer, then=Value(latest.created_at)),
+                    default=F("last_message_at"),
+                    output_field=models.DateTimeField(),
+                ),
+            }
+            unread: Counter[str] = Counter()
+            for message in batch:
+                if message.sender_id != message.receiver_id:
+                    user_a_id, _ = conversation_key(
+                        message.sender_id, message.receiver_id
+                    )
+                    unread[
+                        (
+                            "unread_a"
+                            if message.receiver_id == user_a_id
+                            else "unread_b"
+                        )
+                    ] += 1
+            for field, count in unread.items():
+                changes[field] = F(field) + count
+            self.filter(id=conversation_id).update(**changes)
+
+    def mark_read(self, user_id: UUID, other_user_id: UUID) -> int:
+        """Mark everything ``other_user_id`` sent to ``user_id`` as read."""
+        user_a_id, _ = conversation_key(user_id, other_user_id)
+        unread = "unread_a" if user_id == user_a_id else "unread_b"
+        self.between(user_id, other_user_id).update(**{unread: 0})
+        return Message.objects.filter(
+            sender_id=other_user_id, receiver_id=user_id, read=False
+        ).update(read=True)
+
+
+class Conversation(BaseModel):
+    """One row per pair of users, ordered so that user_a.id < user_b.id."""
+
+    user_a: models.ForeignKey[User, User] = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    user_b: models.ForeignKey[User, User] = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    last_message: models.ForeignKey[Message | None, Message | None] = (
+        models.ForeignKey(
+            Message,
+            on_delete=models.SET_NULL,
+            null=True,
+            blank=True,
+            related_name="+",
+        )
+    )
+    last_message_at: models.DateTimeField[datetime | None, datetime | None] = (
+        models.DateTimeField(null=True, blank=True)
+    )
+    # messages not yet read by user_a and user_b respectively
+    unread_a: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    unread_b: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    objects = ConversationManager()
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_a", "user_b"], name="unique_conversation_pair"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user_a", "-last_message_at", "-id"]),
+            models.Index(fields=["user_b", "-last_message_at", "-id"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_a} ↔ {self.user_b}"
+
+    def other_user(self, user_id: UUID) -> User:
+        return self.user_b if self.user_a_id == user_id else self.user_a
+
+    def unread_for(self, user_id: UUID) -> int:
+        return self.unread_a if self.user_a_id == user_id else self.unread_b
@@ -20,8 +20,15 @@ class MessageIn(BaseModel):
 
 
 class ConversationOut(BaseModel):
+    conversation_id: int
     user_id: str
     username: str
     last_message: str
     last_timestamp: datetime
     profile_url: str | None
+    unread_count: int = 0
+
+
+class ConversationPageSchema(BaseModel):
+    conversations: list[ConversationOut]
+    next_cursor: str | None = None
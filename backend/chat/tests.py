@@ -0,0 +1,151 @@
+import asyncio
+import json
+from uuid import uuid4
+
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from django.test import SimpleTestCase
+from django.test import TransactionTestCase
+
+from chat.chatting import InboxConsumer
+from chat.models import Conversation
+from chat.models import Message
+from chat.writer import MessageWriter
+from content.models import Follow
+from users.models import User
+
+
+async def connect_inbox(user: User) -> ApplicationCommunicator:
+    communicator = ApplicationCommunicator(
+        InboxConsumer.as_asgi(),
+        {
+            "type": "websocket",
+            "path": "/ws/inbox/",
+            "user": user,
+            "subprotocols": [],
+        },
+    )
+    await communicator.send_input({"type": "websocket.connect"})
+    accepted = await communicator.receive_output(timeout=1)
+    assert accepted["type"] == "websocket.accept"
+    return communicator
+
+
+class InboxConsumerTests(SimpleTestCase):
+    async def connect(self) -> ApplicationCommunicator:
+        return await connect_inbox(User(id=uuid4()))
+
+    async def send(self, communicator: ApplicationCommunicator, text: str):
+        await communicator.send_input(
+            {"type": "websocket.receive", "text": text}
+        )
+        return await communicator.receive_output(timeout=1)
+
+    async def test_non_object_frames_are_rejected(self) -> None:
+        communicator = await self.connect()
+        for frame in ("[1, 2]", '"x"', "3", "null", "not json"):
+            with self.subTest(frame=frame):
+                output = await self.send(communicator, frame)
+                self.assertEqual(output["type"], "websocket.send")
+                self.assertEqual(
+                    json.loads(output["text"]),
+                    {"t": "e", "k": None, "e": "Malformed frame."},
+                )
+        # the socket survives and keeps answering
+        output = await self.send(communicator, '{"t": "zz"}')
+        self.assertEqual(
+            json.loads(output["text"])["e"], "Unknown conversation."
+        )
+        await communicator.send_input(
+            {"type": "websocket.disconnect", "code": 1000}
+        )
+        await communicator.wait(timeout=1)
+
+
+class InboxPermissionTests(TransactionTestCase):
+    async def test_unfollow_drops_cached_conversation(self) -> None:
+        alice, bob = await database_sync_to_async(
+            lambda: [
+                User.objects.create(email=f"{name}@example.com")
+                for name in ("alice", "bob")
+            ]
+        )()
+        await database_sync_to_async(
+            lambda: Follow.objects.bulk_create(
+                [
+                    Follow(follower=alice, following=bob),
+                    Follow(follower=bob, following=alice),
+                ]
+            )
+        )()
+        communicator = await connect_inbox(alice)
+        # typing frames are not echoed, so silence means it was allowed
+        await communicator.send_input(
+            {
+                "type": "websocket.receive",
+                "text": f'{{"t": "y", "u": "{bob.id}"}}',
+            }
+        )
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+
+        await database_sync_to_async(
+            lambda: Follow.objects.filter(follower=bob).delete()
+        )()
+        await asyncio.sleep(0.1)
+        await communicator.send_input(
+            {
+                "type": "websocket.receive",
+                "text": f'{{"t": "y", "u": "{bob.id}"}}',
+            }
+        )
+        output = await communicator.receive_output(timeout=1)
+        self.assertEqual(
+            json.loads(output["text"])["e"], "Unknown conversation."
+        )
+        await communicator.send_input(
+            {"type": "websocket.disconnect", "code": 1000}
+        )
+        await communicator.wait(timeout=1)
+
+
+class MessageWriterTests(TransactionTestCase):
+    async def test_failed_batch_reports_only_bad_message(self) -> None:
+        alice, bob = await database_sync_to_async(
+            lambda: [
+                User.objects.create(email=f"{name}@example.com")
+                for name in ("alice", "bob")
+            ]
+        )()
+        conversation = await database_sync_to_async(
+            Conversation.objects.for_pair
+        )(alice.id, bob.id)
+        good = Message(
+            conversation=conversation, sender=alice, receiver=bob, content="a"
+        )
+        bad = Message(
+            conversation_id=conversation.id + 1,
+            sender=alice,
+            receiver=bob,
+            content="b",
+        )
+        saved: list[Message] = []
+        failed: list[Message] = []
+
+        async def on_saved(message: Message) -> None:
+            saved.append(message)
+
+        async def on_failed(message: Message) -> None:
+            failed.append(message)
+
+        writer = MessageWriter(interval=0, batch_size=10)
+        writer.submit(good, on_saved, on_failed)
+        writer.submit(bad, on_saved, on_failed)
+        while len(saved) + len(failed) < 2:
+            await asyncio.sleep(0.01)
+        self.assertEqual(saved, [good])
+        self.assertEqual(failed, [bad])
+        self.assertTrue(
+            await database_sync_to_async(
+                Message.objects.filter(pk=good.pk).exists
+            )()
+        )
@@ -5,10 +5,12 @@ from django.urls import URLPattern
 from django.urls import re_path
 
 from .chatting import ChatConsumer
+from .chatting import InboxConsumer
 
 # Channels websocket URL patterns
 # Pyright can't infer types for ASGI apps, so we ignore it
 websocket_urlpatterns = [  # type:ignore
-    re_path(r"ws/chat/(?P<user_id>\d+)/$", ChatConsumer.as_asgi())  # type: ignore[arg-type]
+    re_path(r"ws/chat/(?P<user_id>[0-9a-fA-F-]{32,36})/$", ChatConsumer.as_asgi()),  # type: ignore[arg-type]
+    re_path(r"ws/inbox/$", InboxConsumer.as_asgi()),  # type: ignore[arg-type]
 ]
 websocket_urlpatterns = cast(List[URLPattern], websocket_urlpatterns)
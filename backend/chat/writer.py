@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import weakref
+from typing import Awaitable
+from typing import Callable
+
+from channels.db import database_sync_to_async
+from django.db import transaction
+
+from chat.models import Conversation
+from chat.models import Message
+from core.metrics import metrics
+from project.env import ENV
+
+logger = logging.getLogger(__name__)
+
+MessageCallback = Callable[[Message], Awaitable[None]]
+Pending = list[tuple[Message, MessageCallback, MessageCallback]]
+
+
+class MessageWriter:
+    """Persists websocket chat messages in batches.
+
+    Consumers submit unsaved messages. A single task per event loop inserts
+    whatever that loop queued up during the last CHAT_FLUSH_SECONDS with one
+    bulk_create, then runs the callbacks in submission order, so every
+    conversation is broadcast and acknowledged in insert order. If a batch
+    fails its messages are retried one at a time, so only the ones that
+    cannot be saved are reported as failed.
+    """
+
+    def __init__(self, interval: float, batch_size: int) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        # each loop flushes only its own queue: callbacks talk to consumers
+        # and channel layers bound to the loop that submitted the message
+        self._pending: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, Pending
+        ] = weakref.WeakKeyDictionary()
+
+    def submit(
+        self,
+        message: Message,
+        on_saved: MessageCallback,
+        on_failed: MessageCallback,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = []
+            loop.create_task(self._run(loop, pending))
+        pending.append((message, on_saved, on_failed))
+
+    async def _run(
+        self, loop: asyncio.AbstractEventLoop, pending: Pending
+    ) -> None:
+        try:
+            while pending:
+                await asyncio.sleep(self.interval)
+                batch = pending[:]
+                pending.clear()
+                await self._flush(batch)
+        finally:
+            # nothing can be queued between the last check and here, so the
+            # next submit on this loop starts a fresh task
+            self._pending.pop(loop, None)
+
+    async def _flush(self, batch: Pending) -> None:
+        try:
+            await self._save([message for message, _, _ in batch])
+        except Exception:
+            logger.exception("Failed to save %d messages", len(batch))
+            metrics.incr("chat.flush_failures")
+            if len(batch) > 1:
+                for entry in batch:
+                    await self._retry(entry)
+            else:
+                for message, _, on_failed in batch:
+                    await self._notify(on_failed, message)
+            return
+        metrics.incr("chat.messages_saved", len(batch))
+        for message, on_saved, _ in batch:
+            await self._notify(on_saved, message)
+
+    async def _retry(
+        self, entry: tuple[Message, MessageCallback, MessageCallback]
+    ) -> None:
+        message, on_saved, on_failed = entry
+        # the rolled back bulk_create may have assigned an id already
+        message.pk = None
+        message._state.adding = True
+        try:
+            await self._save([message])
+        except Exception:
+            logger.exception("Failed to save message")
+            metrics.incr("chat.messages_failed")
+            await self._notify(on_failed, message)
+            return
+        metrics.incr("chat.messages_saved")
+        await self._notify(on_saved, message)
+
+    @staticmethod
+    async def _notify(callback: MessageCallback, message: Message) -> None:
+        try:
+            await callback(message)
+        except Exception:
+            logger.exception("Message callback failed")
+
+    @database_sync_to_async
+    def _save(self, messages: list[Message]) -> None:
+        with metrics.timer("chat.flush"), transaction.atomic():
+            Message.objects.bulk_create(messages, batch_size=self.batch_size)
+            Conversation.objects.record(messages)
+
+
+message_writer = MessageWriter(
+    interval=ENV.CHAT_FLUSH_SECONDS, batch_size=ENV.CHAT_FLUSH_BATCH_SIZE
+)
@@ -1,34 +1,36 @@
+from datetime import datetime
 from typing import cast
 
 from django.db import transaction
-from django.db.models import (
-    Case,
-    Count,
-    Exists,
-    F,
-    IntegerField,
-    OuterRef,
-    Q,
-    QuerySet,
-    Subquery,
-    Value,
-    When,
-)
 from django.http import HttpRequest
 from django.utils import timezone
 from ninja import File, Form, Router, UploadedFile
 from ninja.errors import ValidationError
 
-from content.models import Comment, Follow, Impression, Like, Post, Save, Share
+from content.counters import bump_post_counter, bump_user_counter
+from content.feed import (
+    decode_feed_cursor,
+    encode_feed_cursor,
+    explore_post_ids,
+    friends_post_ids,
+    pop_for_you_post_id,
+    pop_for_you_post_ids,
+    top_up_for_you_queue,
+)
+from content.impressions import record_impressions
+from content.inbox import fan_out_post_async
+from content.models import Comment, Like, Post, Save, Share
 from content.schemas import (
     CommentCreateSchema,
     CommentSchema,
+    FeedPageSchema,
     PaginatedCommentsSchema,
     PaginatedPostsSchema,
     PostSchema,
     ShareCreateSchema,
     ShareResponseSchema,
 )
+from content.serializers import serialize_posts
 from project.schemas import GenericResponse
 from users.auth import JWTAuth
 from users.models import Theme, User
@@ -37,216 +39,87 @@ from utils.video import process_post_video_async
 auth = JWTAuth()
 content_router = Router(tags=["Feeds and Interactions"])
 
+MAX_FEED_PAGE_SIZE = 50
 
-def _get_post_with_interactions(user: User, post_qs: QuerySet[Post, Post]):
-    qs = post_qs.annotate(
-        likes_count=Count("likes", distinct=True),
-        comments_count=Count("comments", distinct=True),
-        saves_count=Count("saves", distinct=True),
-        shares_count=Count("shares", distinct=True),
-        liked=Exists(Like.objects.filter(user=user, post=OuterRef("pk"))),
-        saved=Exists(Save.objects.filter(user=user, post=OuterRef("pk"))),
-    )
-    return qs
-
-
-def _serialize_post(user: User, post: Post) -> PostSchema:
-    return PostSchema(
-        id=post.id,
-        author_id=str(post.author.id),
-        author_username=post.author.username,
-        media_url=post.media(),
-        caption=post.caption,
-        themes=[theme.name for theme in post.themes.all()],
-        created_at=post.created_at,
-        likes_count=getattr(post, "likes_count", 0),
-        comments_count=getattr(post, "comments_count", 0),
-        saves_count=getattr(post, "saves_count", 0),
-        shares_count=getattr(post, "shares_count", 0),
-        liked=getattr(post, "liked", False),
-        saved=getattr(post, "saved", False),
-    )
+
+def _load_feed_posts(post_ids: list[int]) -> list[Post]:
+    by_id = Post.objects.filter(id__in=post_ids).select_related("author").in_bulk()
+    return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+
+def _feed_post(user: User, post_ids: list[int]):
+    posts = _load_feed_posts(post_ids[:1])
+    if posts:
+        record_impressions(user, [posts[0].id])
+        return serialize_posts(user, posts)[0]
+    return GenericResponse(detail="You have reached the end of content.")
 
 
 @content_router.get("/feeds/foryou/", response=PostSchema | GenericResponse, auth=auth)
 def feed_for_you(request: HttpRequest):
     user = cast(User, request.user)
-    base_qs = Post.objects.exclude(author=user).filter(author__gender=user.gender)
-    user_theme_ids = list(user.themes.values_list("id", flat=True))
-    similar_body_type = user.body_type
-    similar_height = user.height
-    similar_weight = user.weight
-    score_annotations = {}
-
-    if user_theme_ids:
-        score_annotations["theme_match"] = Count(
-            "themes", filter=Q(themes__id__in=user_theme_ids), distinct=True
-        )
-    else:
-        score_annotations["theme_match"] = Value(0, output_field=IntegerField())
-
-    if similar_body_type:
-        score_annotations["body_type_match"] = Case(
-            When(author__body_type=similar_body_type, then=1000),
-            default=0,
-            output_field=IntegerField(),
-        )
-    else:
-        score_annotations["body_type_match"] = Value(0, output_field=IntegerField())
-
-    if similar_height:
-        score_annotations["height_match"] = Case(
-            When(
-                author__height__gte=similar_height - 30,
-                author__height__lte=similar_height + 30,
-                then=100,
-            ),
-            default=0,
-            output_field=IntegerField(),
-        )
-    else:
-        score_annotations["height_match"] = Value(0, output_field=IntegerField())
-
-    if similar_weight:
-        score_annotations["weight_match"] = Case(
-            When(
-                author__weight__gte=similar_weight - 15,
-                author__weight__lte=similar_weight + 15,
-                then=50,
-            ),
-            default=0,
-            output_field=IntegerField(),
-        )
-    else:
-        score_annotations["weight_match"] = Value(0, output_field=IntegerField())
-
-    score_annotations["likes_count"] = Count("likes", distinct=True)
-    score_annotations["comments_count"] = Count("comments", distinct=True)
-    score_annotations["shares_count"] = Count("shares", distinct=True)
-    score_annotations["saves_count"] = Count("saves", distinct=True)
-
-    impression_subquery = Impression.objects.filter(
-        user=user, post=OuterRef("pk")
-    ).values("viewed_at")[:1]
-
-    filtered_qs = (
-        base_qs.annotate(**score_annotations)
-        .annotate(
-            last_impression=Subquery(impression_subquery),
-            has_impression=Exists(
-                Impression.objects.filter(user=user, post=OuterRef("pk"))
-            ),
-            content_score=(
-                F("theme_match") * 10
-                + F("body_type_match")
-                + F("height_match")
-                + F("weight_match")
-                + F("likes_count") * 3
-                + F("comments_count") * 5
-                + F("shares_count") * 7
-                + F("saves_count") * 4
-            ),
-        )
-        .distinct()
-    )
-
-    qs = _get_post_with_interactions(user, filtered_qs)
-    post = qs.order_by(
-        "has_impression", "last_impression", "-content_score", "-created_at"
-    ).first()
-
-    if post:
-        Impression.objects.update_or_create(
-            user=user, post=post, defaults={"viewed_at": timezone.now()}
-        )
-        return _serialize_post(user, post)
-    return GenericResponse(detail="You have reached the end of content.")
+    post_id = pop_for_you_post_id(user)
+    response = _feed_post(user, [] if post_id is None else [post_id])
+    top_up_for_you_queue(user)
+    return response
 
 
 @content_router.get("/feeds/friends/", response=PostSchema | GenericResponse, auth=auth)
 def feed_friends(request: HttpRequest):
     user = cast(User, request.user)
-    following_ids = Follow.objects.filter(follower=user).values_list(
-        "following_id", flat=True
-    )
+    return _feed_post(user, friends_post_ids(user))
+
 
-    impression_subquery = Impression.objects.filter(
-        user=user, post=OuterRef("pk")
-    ).values("viewed_at")[:1]
-
-    qs = Post.objects.filter(author_id__in=following_ids).annotate(
-        likes_count=Count("likes", distinct=True),
-        comments_count=Count("comments", distinct=True),
-        shares_count=Count("shares", distinct=True),
-        saves_count=Count("saves", distinct=True),
-        last_impression=Subquery(impression_subquery),
-        has_impression=Exists(
-            Impression.objects.filter(user=user, post=OuterRef("pk"))
-        ),
-        engagement_score=(
-            F("likes_count") * 3
-            + F("comments_count") * 5
-            + F("shares_count") * 7
-            + F("saves_count") * 4
-        ),
+@content_router.get("/feeds/explore/", response=PostSchema | GenericResponse, auth=auth)
+def feed_explore(request: HttpRequest):
+    user = cast(User, request.user)
+    return _feed_post(user, explore_post_ids(user))
+
+
+def _feed_page(
+    user: User, post_ids: list[int], count: int, since: datetime
+) -> FeedPageSchema:
+    posts = _load_feed_posts(post_ids)
+    record_impressions(user, [post.id for post in posts])
+    return FeedPageSchema(
+        posts=serialize_posts(user, posts),
+        next_cursor=encode_feed_cursor(since) if len(posts) == count else None,
     )
 
-    qs = _get_post_with_interactions(user, qs)
-    post = qs.order_by(
-        "has_impression", "last_impression", "-engagement_score", "-created_at"
-    ).first()
 
-    if post:
-        Impression.objects.update_or_create(
-            user=user, post=post, defaults={"viewed_at": timezone.now()}
-        )
-        return _serialize_post(user, post)
-    return GenericResponse(detail="You have reached the end of content.")
+def _page_args(count: int, cursor: str | None) -> tuple[int, datetime]:
+    count = max(1, min(count, MAX_FEED_PAGE_SIZE))
+    since = decode_feed_cursor(cursor) if cursor else timezone.now()
+    return count, since
 
 
-@content_router.get("/feeds/explore/", response=PostSchema | GenericResponse, auth=auth)
-def feed_explore(request: HttpRequest):
+@content_router.get("/feeds/foryou/page/", response=FeedPageSchema, auth=auth)
+def feed_for_you_page(
+    request: HttpRequest, count: int = 10, cursor: str | None = None
+):
     user = cast(User, request.user)
-    following_ids = set(
-        Follow.objects.filter(follower=user).values_list("following_id", flat=True)
-    )
+    count, since = _page_args(count, cursor)
+    page = _feed_page(user, pop_for_you_post_ids(user, count), count, since)
+    top_up_for_you_queue(user)
+    return page
 
-    base_qs = Post.objects.exclude(author=user).exclude(author_id__in=following_ids)
-
-    impression_subquery = Impression.objects.filter(
-        user=user, post=OuterRef("pk")
-    ).values("viewed_at")[:1]
-
-    filtered_qs = base_qs.annotate(
-        likes_count=Count("likes", distinct=True),
-        comments_count=Count("comments", distinct=True),
-        shares_count=Count("shares", distinct=True),
-        saves_count=Count("saves", distinct=True),
-        theme_diversity=Count("themes", distinct=True),
-        last_impression=Subquery(impression_subquery),
-        has_impression=Exists(
-            Impression.objects.filter(user=user, post=OuterRef("pk"))
-        ),
-        engagement_score=(
-            F("likes_count") * 3
-            + F("comments_count") * 5
-            + F("shares_count") * 7
-            + F("saves_count") * 4
-            + F("theme_diversity") * 2
-        ),
-    ).distinct()
-
-    qs = _get_post_with_interactions(user, filtered_qs)
-    post = qs.order_by(
-        "has_impression", "last_impression", "-engagement_score", "?"
-    ).first()
-
-    if post:
-        Impression.objects.update_or_create(
-            user=user, post=post, defaults={"viewed_at": timezone.now()}
-        )
-        return _serialize_post(user, post)
-    return GenericResponse(detail="You have reached the end of content.")
+
+@content_router.get("/feeds/friends/page/", response=FeedPageSchema, auth=auth)
+def feed_friends_page(
+    request: HttpRequest, count: int = 10, cursor: str | None = None
+):
+    user = cast(User, request.user)
+    count, since = _page_args(count, cursor)
+    return _feed_page(user, friends_post_ids(user, count, since), count, since)
+
+
+@content_router.get("/feeds/explore/page/", response=FeedPageSchema, auth=auth)
+def feed_explore_page(
+    request: HttpRequest, count: int = 10, cursor: str | None = None
+):
+    user = cast(User, request.user)
+    count, since = _page_args(count, cursor)
+    return _feed_page(user, explore_post_ids(user, count, since), count, since)
 
 
 @content_router.get("/feeds/upload/", response=PaginatedPostsSchema, auth=auth)
@@ -258,10 +131,8 @@ def feed_upload(
     user = cast(User, request.user)
     qs = Post.objects.filter(author=user).order_by("-created_at")
     total = qs.count()
-    posts = qs[offset : offset + limit]
-    posts = _get_post_with_interactions(user, posts)
-    posts = list(posts)
-    serialized_posts = [_serialize_post(user, p) for p in posts]
+    posts = list(qs.select_related("author")[offset : offset + limit])
+    serialized_posts = serialize_posts(user, posts)
 
     return PaginatedPostsSchema(
         posts=serialized_posts, total=total, offset=offset, limit=limit
@@ -275,11 +146,12 @@ def like_post(request: HttpRequest, post_id: int):
     if not post:
         return {"error": "Post not found"}
 
-    like, created = Like.objects.get_or_create(user=user, post=post)
-    if not created:
-        like.delete()
-        return {"liked": False}
-    return {"liked": True}
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=user, post=post)
+        if not created:
+            like.delete()
+        bump_post_counter(post.id, "likes_count", 1 if created else -1)
+    return {"liked": created}
 
 
 @content_router.post("/interactions/save/", auth=auth)
@@ -289,11 +161,12 @@ def save_post(request: HttpRequest, post_id: int):
     if not post:
         return {"error": "Post not found"}
 
-    save, created = Save.objects.get_or_create(user=user, post=post)
-    if not created:
-        save.delete()
-        return {"saved": False}
-    return {"saved": True}
+    with transaction.atomic():
+        save, created = Save.objects.get_or_create(user=user, post=post)
+        if not created:
+            save.delete()
+        bump_post_counter(post.id, "saves_count", 1 if created else -1)
+    return {"saved": created}
 
 
 @content_router.get(
@@ -339,7 +212,11 @@ def comment_post(request: HttpRequest, payload: CommentCreateSchema):
     if not post:
         return {"error": "Post not found"}
 
-    comment = Comment.objects.create(user=user, post=post, text=payload.text)
+    with transaction.atomic():
+        comment = Comment.objects.create(
+            user=user, post=post, text=payload.text
+        )
+        bump_post_counter(post.id, "comments_count", 1)
     return CommentSchema(
         id=comment.id,
         user_id=str(user.id),
@@ -356,8 +233,10 @@ def share_post(request: HttpRequest, payload: ShareCreateSchema):
     if not post:
         return {"error": "Post not found"}
 
-    share = Share(user=user, post=post)
-    share.save()
+    with transaction.atomic():
+        share = Share(user=user, post=post)
+        share.save()
+        bump_post_counter(post.id, "shares_count", 1)
     return ShareResponseSchema(slug=share.slug)
 
 
@@ -400,11 +279,11 @@ def create_post(
 
         post_obj.save()
 
-        post_obj.themes.set(
-            [Theme.objects.get_or_create(name=theme_name)[0] for theme_name in themes]
-        )
+        post_obj.themes.set(Theme.objects.resolve(themes))
+        bump_user_counter(user.id, "posts_count", 1)
 
     process_post_video_async(post_obj)
+    fan_out_post_async(post_obj)
     return {
         "id": post_obj.id,
         "media": post_obj.media(),
@@ -417,34 +296,20 @@ def create_post(
 )
 def get_post_by_id(request: HttpRequest, post_id: int):
     user = cast(User, request.user)
-    post_qs = Post.objects.filter(id=post_id)
-    if not post_qs.exists():
-        return GenericResponse(detail="Post not found")
-
-    qs = _get_post_with_interactions(user, post_qs)
-    post = qs.first()
+    post = Post.objects.filter(id=post_id).select_related("author").first()
     if not post:
         return GenericResponse(detail="Post not found")
 
-    Impression.objects.get_or_create(user=user, post=post)
-    return _serialize_post(user, post)
+    record_impressions(user, [post.id])
+    return serialize_posts(user, [post])[0]
 
 
 @content_router.get("/posts/user/{user_id}/", response=list[PostSchema], auth=auth)
 def get_post_by_user_id(request: HttpRequest, user_id: str):
     user = cast(User, request.user)
-    return_posts: list[PostSchema] = []
-    post_qs = Post.objects.filter(author__id=user_id).order_by("-created_at")
-
-    if not post_qs.exists():
-        return return_posts
-
-    qs = _get_post_with_interactions(user, post_qs)
-    posts = list(qs)
-    if not posts:
-        return return_posts
-
-    for post in posts:
-        return_posts.append(_serialize_post(user, post))
-
-    return return_posts
+    posts = list(
+        Post.objects.filter(author__id=user_id)
+        .select_related("author")
+        .order_by("-created_at")
+    )
+    return serialize_posts(user, posts)
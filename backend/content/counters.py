@@ -0,0 +1,253 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import Callable
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import IntegerField
+from django.db.models import Model
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from content.hot import HOT_SCORE_SEED_WEIGHT
+from content.hot import HOT_SCORE_WEIGHTS
+from content.hot import add_hot
+from content.hot import hot_term
+from content.models import HOT_SCORE_STALE
+from content.models import Comment
+from content.models import Follow
+from content.models import JobCheckpoint
+from content.models import Like
+from content.models import Post
+from content.models import Save
+from content.models import Share
+from users.cache import forget_user
+from users.models import User
+
+POST_COUNTERS: dict[str, type[Model]] = {
+    "likes_count": Like,
+    "comments_count": Comment,
+    "saves_count": Save,
+    "shares_count": Share,
+}
+USER_COUNTERS: dict[str, tuple[type[Model], str]] = {
+    "followers_count": (Follow, "following"),
+    "following_count": (Follow, "follower"),
+    "posts_count": (Post, "author"),
+}
+HOT_SCORED_FIELDS = {field: f"scored_{field}" for field in POST_COUNTERS}
+HOT_SUM_FIELDS = {
+    field: f"hot_{field.removesuffix('_count')}" for field in POST_COUNTERS
+}
+HOT_SCORE_CHECKPOINT = "hot_score"
+# renewed every batch; a run that dies stops blocking the next one after it
+HOT_SCORE_LEASE = timedelta(minutes=5)
+
+
+def bump_post_counter(post_id: int, field: str, delta: int) -> None:
+    Post.objects.filter(id=post_id).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def bump_user_counter(user_id: UUID, field: str, delta: int) -> None:
+    User.objects.filter(id=user_id).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+def _actual_count(model: type[Model], fk: str) -> Coalesce:
+    return Coalesce(
+        Subquery(
+            model._default_manager.filter(  # type:ignore
+                **{fk: OuterRef("pk")}
+            )
+            .order_by()
+            .values(fk)
+            .annotate(total=Count("*"))
+            .values("total")
+        ),
+        Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _reconcile_counters(
+    model: type[Model],
+    counters: dict[str, tuple[type[Model], str]],
+    batch_size: int,
+    on_repaired: Callable[[list[Any]], None] | None = None,
+) -> int:
+    qs = model._default_manager.annotate(  # type:ignore
+        **{
+            f"actual_{field}": _actual_count(source, fk)
+            for field, (source, fk) in counters.items()
+        }
+    )
+    drift = Q()
+    for field in counters:
+        drift |= ~Q(**{field: F(f"actual_{field}")})
+    qs = qs.filter(drift).only("pk", *counters).order_by("pk")
+
+    repaired = 0
+    last_pk = None
+    while True:
+        page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            return repaired
+        for obj in batch:
+            for field in counters:
+                setattr(obj, field, getattr(obj, f"actual_{field}"))
+        model._default_manager.bulk_update(  # type:ignore
+            batch, list(counters)
+        )
+        if on_repaired:
+            on_repaired(batch)
+        repaired += len(batch)
+        last_pk = batch[-1].pk
+
+
+def reconcile_post_counters(batch_size: int = 1000) -> int:
+    return _reconcile_counters(
+        Post,
+        {field: (model, "post") for field, model in POST_COUNTERS.items()},
+        batch_size,
+    )
+
+
+def reconcile_user_counters(batch_size: int = 1000) -> int:
+    def forget(users: list[User]) -> None:
+        for user in users:
+            forget_user(user.id)
+
+    return _reconcile_counters(User, USER_COUNTERS, batch_size, forget)
+
+
+def _claim_job(name: str) -> JobCheckpoint | None:
+    JobCheckpoint.objects.get_or_create(name=name)
+    now = timezone.now()
+    claimed = (
+        JobCheckpoint.objects.filter(name=name)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        .update(locked_until=now + HOT_SCORE_LEASE)
+    )
+    return JobCheckpoint.objects.get(name=name) if claimed else None
+
+
+def _total_hot_score(post: Post) -> float:
+    score = hot_term(HOT_SCORE_SEED_WEIGHT, post.created_at)
+    for hot in HOT_SUM_FIELDS.values():
+        term = getattr(post, hot)
+        if term is not None:
+            score = add_hot(score, term)
+    return score
+
+
+def _rescore(post: Post, now: datetime) -> None:
+    """Apply the counter changes since ``post`` was last scored."""
+    for field, scored in HOT_SCORED_FIELDS.items():
+        hot = HOT_SUM_FIELDS[field]
+        count, before = getattr(post, field), getattr(post, scored)
+        term = getattr(post, hot)
+        if count > before:
+            added = hot_term(HOT_SCORE_WEIGHTS[field] * (count - before), now)
+            term = added if term is None else add_hot(term, added)
+        elif count < before:
+            # the removed interactions' times are gone, so take off their
+            # share of the counter's decayed weight
+            term = (
+                term + math.log(count / before)
+                if count and term is not None
+                else None
+            )
+        setattr(post, hot, term)
+        setattr(post, scored, count)
+    post.hot_score = _total_hot_score(post)
+
+
+def update_hot_scores(rebuild: bool = False, batch_size: int = 1000) -> int:
+    """Fold counter changes since the last run into Post.hot_score.
+
+    Each post keeps a decayed weight per counter and the counts it was
+    last scored with. New interactions count from the time of the run; a
+    removal scales its counter's weight down by the share it took away,
+    so it never touches the rest of the post's engagement. ``rebuild``
+    recomputes every post from the interaction rows with their real
+    timestamps. Batches commit on their own; the job's checkpoint lease
+    keeps two runs from overlapping, and a run that finds it held does
+    nothing.
+    """
+    checkpoint = _claim_job(HOT_SCORE_CHECKPOINT)
+    if checkpoint is None:
+        return 0
+    now = timezone.now()
+    fields = [
+        "hot_score",
+        *HOT_SUM_FIELDS.values(),
+        *HOT_SCORED_FIELDS.values(),
+    ]
+    posts = Post.objects.only("id", "created_at", *POST_COUNTERS, *fields)
+
+    sums: dict[tuple[int, str], float] = {}
+    folded: dict[tuple[int, str], int] = defaultdict(int)
+    if rebuild:
+        for field, model in POST_COUNTERS.items():
+            weight = HOT_SCORE_WEIGHTS[field]
+            for (
+                post_id,
+                created_at,
+            ) in model._default_manager.values_list(  # type:ignore
+                "post_id", "created_at"
+            ).iterator():
+                term = hot_term(weight, created_at)
+                previous = sums.get((post_id, field))
+                sums[post_id, field] = (
+                    term if previous is None else add_hot(previous, term)
+                )
+                folded[post_id, field] += 1
+    else:
+        posts = posts.filter(HOT_SCORE_STALE)
+
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    posts.filter(id__gt=last_id).order_by("id")[:batch_size]
+                )
+                if not batch:
+                    break
+                for post in batch:
+                    if not rebuild:
+                        _rescore(post, now)
+                        continue
+                    # whatever changed after the scan is applied next run
+                    for field, scored in HOT_SCORED_FIELDS.items():
+                        key = (post.id, field)
+                        setattr(post, HOT_SUM_FIELDS[field], sums.get(key))
+                        setattr(post, scored, folded.get(key, 0))
+                    post.hot_score = _total_hot_score(post)
+                Post.objects.bulk_update(batch, fields)
+                JobCheckpoint.objects.filter(id=checkpoint.id).update(
+                    locked_until=timezone.now() + HOT_SCORE_LEASE
+                )
+            updated += len(batch)
+            last_id = batch[-1].id
+        checkpoint.last_run_at = now
+    finally:
+        checkpoint.locked_until = None
+        checkpoint.save(update_fields=["last_run_at", "locked_until"])
+    return updated
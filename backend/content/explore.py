@@ -0,0 +1,126 @@
+import heapq
+import math
+import random
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Container
+from uuid import UUID
+
+from content.models import Post
+from core.metrics import metrics
+from core.snapshot import PeriodicSnapshot
+from project.env import ENV
+
+EXPLORE_MIN_WEIGHT = 1e-6
+
+
+@dataclass
+class ExploreSnapshot:
+    post_ids: list[int]
+    author_ids: list[UUID]
+    weights: list[float]
+    prob: list[float] = field(init=False, default_factory=list)
+    alias: list[int] = field(init=False, default_factory=list)
+
+    def __post_init__(self) -> None:
+        # Vose's alias method: O(n) build, O(1) per weighted draw
+        n = len(self.weights)
+        total = sum(self.weights)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        if not n or total <= 0:
+            return
+        scaled = [w * n / total for w in self.weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+    def draw(self, rng: random.Random) -> int:
+        i = rng.randrange(len(self.post_ids))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def build_explore_snapshot(limit: int | None = None) -> ExploreSnapshot:
+    rows = Post.objects.order_by("-hot_score").values_list(
+        "id", "author_id", "hot_score"
+    )[: limit or ENV.EXPLORE_SNAPSHOT_SIZE]
+    post_ids: list[int] = []
+    author_ids: list[UUID] = []
+    hot_scores: list[float] = []
+    for post_id, author_id, hot_score in rows:
+        post_ids.append(post_id)
+        author_ids.append(author_id)
+        hot_scores.append(hot_score)
+    # hot scores are logs of decayed engagement; weigh relative to the top
+    # and keep a floor so cold posts stay reachable
+    top = hot_scores[0] if hot_scores else 0.0
+    weights = [max(math.exp(h - top), EXPLORE_MIN_WEIGHT) for h in hot_scores]
+    return ExploreSnapshot(post_ids, author_ids, weights)
+
+
+class ExploreSampler(PeriodicSnapshot[ExploreSnapshot]):
+    """Draws weighted explore candidates from a periodically rebuilt snapshot."""
+
+    thread_name = "Explore snapshot refresh"
+
+    def __init__(self, ttl: float) -> None:
+        super().__init__(ttl)
+        self._rng = random.Random()
+
+    def build(self) -> ExploreSnapshot:
+        with metrics.timer("explore.snapshot_refresh"):
+            snapshot = build_explore_snapshot()
+        metrics.set_gauge("explore.snapshot_size", len(snapshot))
+        return snapshot
+
+    def sample(
+        self,
+        count: int,
+        exclude_authors: Container[UUID],
+        seen: Container[int],
+    ) -> list[int]:
+        snapshot = self.snapshot()
+        if not len(snapshot):
+            return []
+
+        def eligible(i: int) -> bool:
+            return (
+                snapshot.author_ids[i] not in exclude_authors
+                and snapshot.post_ids[i] not in seen
+            )
+
+        picked: dict[int, None] = {}
+        attempts = count * ENV.EXPLORE_SAMPLE_ATTEMPTS
+        while len(picked) < count and attempts > 0:
+            attempts -= 1
+            i = snapshot.draw(self._rng)
+            if i not in picked and eligible(i):
+                picked[i] = None
+
+        if len(picked) < count:
+            # rejection sampling ran dry; weighted reservoir over the rest
+            rest = heapq.nlargest(
+                count - len(picked),
+                (
+                    i
+                    for i in range(len(snapshot))
+                    if i not in picked and eligible(i)
+                ),
+                key=lambda i: self._rng.random()
+                ** (1.0 / snapshot.weights[i]),
+            )
+            picked.update(dict.fromkeys(rest))
+        return [snapshot.post_ids[i] for i in picked]
+
+
+explore_sampler = ExploreSampler(ttl=ENV.EXPLORE_SNAPSHOT_SECONDS)
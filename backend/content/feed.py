@@ -0,0 +1,356 @@
+import logging
+import threading
+from datetime import datetime
+from datetime import timedelta
+from functools import cache
+from typing import TYPE_CHECKING
+from typing import Iterable
+from typing import Iterator
+
+from django.core import signing
+from django.db import connection
+from django.db import transaction
+from django.db.models import Case
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import IntegerField
+from django.db.models import Max
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.db.models import Value
+from django.db.models import When
+from django.utils import timezone
+from ninja.errors import ValidationError
+
+from content.explore import explore_sampler
+from content.impressions import pending_impressions
+from content.impressions import seen_posts
+from content.inbox import friends_candidate_ids
+from content.models import FeedCandidate
+from content.models import Follow
+from content.models import Impression
+from content.models import Post
+from project.env import ENV
+from users.models import User
+
+if TYPE_CHECKING:
+    from content.ranker import ForYouRanker
+
+logger = logging.getLogger(__name__)
+
+FEED_CURSOR_SALT = "content.feed.cursor"
+FEED_CURSOR_MAX_AGE = 60 * 60 * 24
+
+_refilling: set[str] = set()
+_refilling_lock = threading.Lock()
+
+
+def _for_you_posts(user: User) -> QuerySet[Post, Post]:
+    return Post.objects.exclude(author=user).filter(author__gender=user.gender)
+
+
+def for_you_queryset(user: User) -> QuerySet[Post, Post]:
+    base_qs = _for_you_posts(user)
+    user_theme_ids = list(user.themes.values_list("id", flat=True))
+    similar_body_type = user.body_type
+    similar_height = user.height
+    similar_weight = user.weight
+    score_annotations = {}
+
+    if user_theme_ids:
+        score_annotations["theme_match"] = Count(
+            "themes", filter=Q(themes__id__in=user_theme_ids), distinct=True
+        )
+    else:
+        score_annotations["theme_match"] = Value(
+            0, output_field=IntegerField()
+        )
+
+    if similar_body_type:
+        score_annotations["body_type_match"] = Case(
+            When(author__body_type=similar_body_type, then=1000),
+            default=0,
+            output_field=IntegerField(),
+        )
+    else:
+        score_annotations["body_type_match"] = Value(
+            0, output_field=IntegerField()
+        )
+
+    if similar_height:
+        score_annotations["height_match"] = Case(
+            When(
+                author__height__gte=similar_height - 30,
+                author__height__lte=similar_height + 30,
+                then=100,
+            ),
+            default=0,
+            output_field=IntegerField(),
+        )
+    else:
+        score_annotations["height_match"] = Value(
+            0, output_field=IntegerField()
+        )
+
+    if similar_weight:
+        score_annotations["weight_match"] = Case(
+            When(
+                author__weight__gte=similar_weight - 15,
+                author__weight__lte=similar_weight + 15,
+                then=50,
+            ),
+            default=0,
+            output_field=IntegerField(),
+        )
+    else:
+        score_annotations["weight_match"] = Value(
+            0, output_field=IntegerField()
+        )
+
+    return (
+        base_qs.annotate(**score_annotations)
+        .annotate(
+            content_score=(
+                F("theme_match") * 10
+                + F("body_type_match")
+                + F("height_match")
+                + F("weight_match")
+                + F("likes_count") * 3
+                + F("comments_count") * 5
+                + F("shares_count") * 7
+                + F("saves_count") * 4
+            ),
+        )
+        .distinct()
+        .order_by("-content_score", "-created_at")
+    )
+
+
+def oldest_views(
+    user: User,
+    posts: QuerySet[Post, Post],
+    limit: int,
+    since: datetime | None = None,
+    exclude: Iterable[int] = (),
+) -> list[int]:
+    if limit <= 0:
+        return []
+    exclude = list(exclude)
+    pending = pending_impressions(user)
+    viewed = Impression.objects.filter(user=user, post__in=posts).exclude(
+        post_id__in=[*exclude, *pending]
+    )
+    if since:
+        viewed = viewed.filter(viewed_at__lt=since)
+    post_ids = list(
+        viewed.order_by("viewed_at").values_list("post_id", flat=True)[:limit]
+    )
+    if len(post_ids) < limit and pending:
+        # views still sitting in the impression buffer are the most recent
+        recent = set(
+            posts.filter(
+                id__in=[
+                    post_id
+                    for post_id, viewed_at in pending.items()
+                    if since is None or viewed_at < since
+                ]
+            )
+            .exclude(id__in=[*exclude, *post_ids])
+            .values_list("id", flat=True)
+        )
+        post_ids += sorted(recent, key=pending.__getitem__)[
+            : limit - len(post_ids)
+        ]
+    return post_ids
+
+
+def friends_post_ids(
+    user: User, count: int = 1, since: datetime | None = None
+) -> list[int]:
+    candidates = Post.objects.filter(id__in=friends_candidate_ids(user))
+    ranked = candidates.order_by("-hot_score", "-created_at").values_list(
+        "id", flat=True
+    )
+    seen = seen_posts(user)
+    post_ids = [post_id for post_id in ranked if post_id not in seen][:count]
+    post_ids += oldest_views(
+        user, candidates, count - len(post_ids), since, exclude=post_ids
+    )
+    return post_ids
+
+
+def explore_post_ids(
+    user: User, count: int = 1, since: datetime | None = None
+) -> list[int]:
+    excluded_authors = set(
+        Follow.objects.filter(follower=user).values_list(
+            "following_id", flat=True
+        )
+    )
+    excluded_authors.add(user.id)
+    post_ids = explore_sampler.sample(
+        count, excluded_authors, seen_posts(user)
+    )
+    # nothing unseen is left; rotate the oldest views back in
+    post_ids += oldest_views(
+        user,
+        Post.objects.exclude(author_id__in=excluded_authors),
+        count - len(post_ids),
+        since,
+        exclude=post_ids,
+    )
+    return post_ids
+
+
+def encode_feed_cursor(since: datetime) -> str:
+    return signing.dumps({"since": since.isoformat()}, salt=FEED_CURSOR_SALT)
+
+
+def decode_feed_cursor(cursor: str) -> datetime:
+    try:
+        data = signing.loads(
+            cursor, salt=FEED_CURSOR_SALT, max_age=FEED_CURSOR_MAX_AGE
+        )
+        return datetime.fromisoformat(data["since"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise ValidationError([{"detail": "Invalid or expired cursor"}])
+
+
+@cache
+def numpy_ranker() -> "ForYouRanker | None":
+    try:
+        from content.ranker import for_you_ranker
+    except ImportError as error:
+        logger.warning("FEED_RANKER=numpy unavailable, using SQL: %s", error)
+        return None
+    return for_you_ranker
+
+
+def rank_for_you(
+    user: User, limit: int, exclude: Iterable[int] = ()
+) -> Iterator[tuple[int, int]]:
+    if ENV.FEED_RANKER == "numpy" and (ranker := numpy_ranker()):
+        return ranker.rank(user, limit, exclude)
+    return (
+        for_you_queryset(user)
+        .exclude(id__in=exclude)
+        .values_list("id", "content_score")[:limit]
+        .iterator(chunk_size=min(limit, 2000))
+    )
+
+
+def refill_for_you_queue(
+    user: User, size: int | None = None, exclude: Iterable[int] = ()
+) -> int:
+    size = size or ENV.FOR_YOU_QUEUE_SIZE
+    seen = seen_posts(user)
+    skip = set(exclude)
+    queued = FeedCandidate.objects.filter(user=user)
+    ranked = rank_for_you(
+        user,
+        size + len(seen) + len(skip),
+        exclude=queued.values_list("post_id", flat=True),
+    )
+    rows: list[tuple[int, int]] = []
+    for post_id, score in ranked:
+        if post_id in seen or post_id in skip:
+            continue
+        rows.append((post_id, score))
+        if len(rows) == size:
+            break
+    rows += [
+        (post_id, 0)
+        for post_id in oldest_views(
+            user,
+            _for_you_posts(user).exclude(id__in=queued.values("post_id")),
+            size - len(rows),
+            exclude=skip,
+        )
+    ]
+    if not rows:
+        return 0
+
+    start = queued.aggregate(last=Max("rank"))["last"] or 0
+    FeedCandidate.objects.bulk_create(
+        [
+            FeedCandidate(
+                user=user, post_id=post_id, rank=start + i, score=score
+            )
+            for i, (post_id, score) in enumerate(rows, start=1)
+        ],
+        ignore_conflicts=True,
+    )
+    return len(rows)
+
+
+def _refill_in_background(user_id: str) -> None:
+    try:
+        user = User.objects.filter(id=user_id).first()
+        if user:
+            refill_for_you_queue(user)
+    finally:
+        with _refilling_lock:
+            _refilling.discard(user_id)
+        connection.close()
+
+
+def refill_for_you_queue_async(user: User) -> None:
+    user_id = str(user.id)
+    with _refilling_lock:
+        if user_id in _refilling:
+            return
+        _refilling.add(user_id)
+    threading.Thread(
+        target=_refill_in_background,
+        args=(user_id,),
+        daemon=True,
+        name="For you queue refill",
+    ).start()
+
+
+def clear_for_you_queue(user: User) -> None:
+    FeedCandidate.objects.filter(user=user).delete()
+
+
+def _pop_candidates(user: User, count: int) -> list[FeedCandidate]:
+    with transaction.atomic():
+        candidates = list(
+            FeedCandidate.objects.select_for_update(skip_locked=True)
+            .filter(user=user)
+            .order_by("rank")[:count]
+        )
+        if candidates:
+            FeedCandidate.objects.filter(
+                id__in=[c.id for c in candidates]
+            ).delete()
+    return candidates
+
+
+def pop_for_you_post_ids(user: User, count: int = 1) -> list[int]:
+    candidates = _pop_candidates(user, count)
+    stale_before = timezone.now() - timedelta(
+        minutes=ENV.FOR_YOU_QUEUE_TTL_MINUTES
+    )
+    if not candidates or candidates[0].created_at < stale_before:
+        clear_for_you_queue(user)
+        refill_for_you_queue(user)
+        candidates = _pop_candidates(user, count)
+    elif len(candidates) < count:
+        refill_for_you_queue(user, exclude=[c.post_id for c in candidates])
+        candidates += _pop_candidates(user, count - len(candidates))
+    return [c.post_id for c in candidates]
+
+
+def pop_for_you_post_id(user: User) -> int | None:
+    post_ids = pop_for_you_post_ids(user, 1)
+    return post_ids[0] if post_ids else None
+
+
+def top_up_for_you_queue(user: User) -> None:
+    low = ENV.FOR_YOU_QUEUE_REFILL_AT
+    if (
+        not FeedCandidate.objects.filter(user=user)
+        .order_by("rank")[low - 1 : low]
+        .exists()
+    ):
+        refill_for_you_queue_async(user)
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from typing import Any
+from uuid import UUID
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from content.models import Follow
+from core.metrics import metrics
+from core.snapshot import JournaledSnapshot
+from project.env import ENV
+
+FOLLOWING_CACHE_KEY = "content.graph.following.{}"
+
+Edges = defaultdict[UUID, set[UUID]]
+
+
+class SocialGraph(JournaledSnapshot[Edges]):
+    """Answers follows(a, b) and mutual(a, b) without touching Follow.
+
+    ``local`` keeps every edge in process memory, patched by the Follow
+    signals and rebuilt every SOCIAL_GRAPH_RESYNC_SECONDS so edges made by
+    other workers show up. ``shared`` keeps each user's following set in
+    the Django cache instead, loaded on demand and dropped on change, for
+    deployments where the full graph should not live in every worker.
+    """
+
+    thread_name = "Social graph resync"
+
+    def __init__(self, backend: str, resync_interval: float) -> None:
+        super().__init__(resync_interval)
+        self.backend = backend
+
+    def build(self) -> Edges:
+        following: Edges = defaultdict(set)
+        with metrics.timer("graph.resync"):
+            for follower_id, following_id in Follow.objects.values_list(
+                "follower_id", "following_id"
+            ).iterator(chunk_size=10000):
+                following[follower_id].add(following_id)
+        metrics.set_gauge("graph.edges", sum(map(len, following.values())))
+        return following
+
+    def following_ids(self, user_id: UUID) -> set[UUID]:
+        if self.backend == "shared":
+            key = FOLLOWING_CACHE_KEY.format(user_id)
+            following: set[UUID] | None = cache.get(key)
+            if following is None:
+                following = set(
+                    Follow.objects.filter(follower_id=user_id).values_list(
+                        "following_id", flat=True
+                    )
+                )
+                cache.set(key, following, self.ttl)
+            return following
+        return self.snapshot().get(user_id, set())
+
+    def follows(self, follower_id: UUID, following_id: UUID) -> bool:
+        return following_id in self.following_ids(follower_id)
+
+    def mutual(self, user1_id: UUID, user2_id: UUID) -> bool:
+        return self.follows(user1_id, user2_id) and self.follows(
+            user2_id, user1_id
+        )
+
+    def apply(self, value: Edges, change: tuple[bool, UUID, UUID]) -> None:
+        added, follower_id, following_id = change
+        if added:
+            value[follower_id].add(following_id)
+        else:
+            value.get(follower_id, set()).discard(following_id)
+
+    def edge_changed(
+        self, follower_id: UUID, following_id: UUID, added: bool
+    ) -> None:
+        if self.backend == "shared":
+            cache.delete(FOLLOWING_CACHE_KEY.format(follower_id))
+            return
+        self.changed((added, follower_id, following_id))
+
+
+def mutual_followers(user1_id: UUID, user2_id: UUID) -> bool:
+    """Reads Follow directly, for permission checks that must see a
+    follow or unfollow made by another process straight away."""
+    return (
+        Follow.objects.filter(
+            Q(follower_id=user1_id, following_id=user2_id)
+            | Q(follower_id=user2_id, following_id=user1_id)
+        ).count()
+        == 2
+    )
+
+
+social_graph = SocialGraph(
+    backend=ENV.SOCIAL_GRAPH_BACKEND,
+    resync_interval=ENV.SOCIAL_GRAPH_RESYNC_SECONDS,
+)
+
+
+@receiver(post_save, sender=Follow)
+def _follow_saved(sender: type[Follow], instance: Follow, **kwargs: Any):
+    if kwargs.get("created"):
+        transaction.on_commit(
+            lambda: social_graph.edge_changed(
+                instance.follower_id, instance.following_id, added=True
+            )
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def _follow_deleted(sender: type[Follow], instance: Follow, **kwargs: Any):
+    transaction.on_commit(
+        lambda: social_graph.edge_changed(
+            instance.follower_id, instance.following_id, added=False
+        )
+    )
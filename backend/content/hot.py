@@ -0,0 +1,34 @@
+import math
+from datetime import UTC
+from datetime import datetime
+
+from django.utils import timezone
+
+from project.env import ENV
+
+# Scores are log(sum(w * exp(rate * (t - HOT_SCORE_EPOCH)))) over every
+# interaction. Decaying all posts to "now" subtracts the same constant, so
+# the stored value orders posts correctly without ever being rewritten.
+# Changing HOT_SCORE_HALF_LIFE_HOURS needs `update_hot_scores --rebuild`.
+HOT_SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=UTC)
+HOT_SCORE_WEIGHTS = {
+    "likes_count": 3.0,
+    "comments_count": 5.0,
+    "shares_count": 7.0,
+    "saves_count": 4.0,
+}
+HOT_SCORE_SEED_WEIGHT = 1.0
+
+
+def hot_term(weight: float, at: datetime) -> float:
+    rate = math.log(2) / (ENV.HOT_SCORE_HALF_LIFE_HOURS * 3600)
+    return math.log(weight) + (at - HOT_SCORE_EPOCH).total_seconds() * rate
+
+
+def add_hot(a: float, b: float) -> float:
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+def initial_hot_score() -> float:
+    return hot_term(HOT_SCORE_SEED_WEIGHT, timezone.now())
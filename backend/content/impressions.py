@@ -0,0 +1,210 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Iterable
+from uuid import UUID
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from content.models import Impression
+from content.models import Post
+from content.seen import SeenSet
+from core.cache import TTLCache
+from core.metrics import metrics
+from project.env import ENV
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class ImpressionBuffer:
+    """Coalesces (user, post) -> viewed_at and writes it in bulk."""
+
+    def __init__(
+        self, max_size: int, flush_interval: float, max_pending: int
+    ) -> None:
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: dict[tuple[UUID, int], datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, user_id: UUID, post_ids: Iterable[int], viewed_at: datetime):
+        with self._lock:
+            for post_id in post_ids:
+                self._pending[(user_id, post_id)] = viewed_at
+            self._trim()
+            depth = len(self._pending)
+        metrics.set_gauge("impressions.buffer_depth", depth)
+        self._ensure_started()
+        if depth >= self.max_size:
+            self._wakeup.set()
+
+    def _trim(self) -> None:
+        # callers hold self._lock
+        dropped = 0
+        while len(self._pending) > self.max_pending:
+            del self._pending[next(iter(self._pending))]
+            dropped += 1
+        if dropped:
+            metrics.incr("impressions.dropped", dropped)
+
+    @staticmethod
+    def _drop_orphans(
+        batch: dict[tuple[UUID, int], datetime],
+    ) -> dict[tuple[UUID, int], datetime]:
+        """Leave out rows whose user or post was deleted before the flush."""
+        post_ids = set(
+            Post.objects.filter(
+                id__in={post_id for _, post_id in batch}
+            ).values_list("id", flat=True)
+        )
+        user_ids = set(
+            User.objects.filter(
+                id__in={user_id for user_id, _ in batch}
+            ).values_list("id", flat=True)
+        )
+        kept = {
+            (user_id, post_id): at
+            for (user_id, post_id), at in batch.items()
+            if user_id in user_ids and post_id in post_ids
+        }
+        if len(kept) < len(batch):
+            metrics.incr("impressions.dropped", len(batch) - len(kept))
+        return kept
+
+    def pending_for(self, user_id: UUID) -> dict[int, datetime]:
+        with self._lock:
+            return {
+                post_id: viewed_at
+                for (uid, post_id), viewed_at in self._pending.items()
+                if uid == user_id
+            }
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                Impression.objects.bulk_create(
+                    [
+                        Impression(
+                            user_id=user_id, post_id=post_id, viewed_at=at
+                        )
+                        for (user_id, post_id), at in batch.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["user", "post"],
+                    update_fields=["viewed_at"],
+                )
+            except Exception:
+                logger.exception("Failed to flush %d impressions", len(batch))
+                metrics.incr("impressions.flush_failures")
+                try:
+                    batch = self._drop_orphans(batch)
+                except Exception:
+                    logger.exception("Failed to check impressions for orphans")
+                with self._lock:
+                    # retried rows are older than anything added since
+                    for key, at in self._pending.items():
+                        if key not in batch or batch[key] < at:
+                            batch[key] = at
+                    self._pending = batch
+                    self._trim()
+                return 0
+            finally:
+                metrics.observe(
+                    "impressions.flush", time.perf_counter() - start
+                )
+                with self._lock:
+                    depth = len(self._pending)
+                metrics.set_gauge("impressions.buffer_depth", depth)
+
+            metrics.incr("impressions.flushed", len(batch))
+            return len(batch)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="Impression flusher"
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+impression_buffer = ImpressionBuffer(
+    max_size=ENV.IMPRESSION_BUFFER_MAX_SIZE,
+    flush_interval=ENV.IMPRESSION_BUFFER_FLUSH_SECONDS,
+    max_pending=ENV.IMPRESSION_BUFFER_MAX_PENDING,
+)
+atexit.register(impression_buffer.flush)
+
+_seen_cache: TTLCache[UUID, SeenSet] = TTLCache(
+    maxsize=ENV.SEEN_SET_CACHE_SIZE, ttl=ENV.SEEN_SET_TTL_SECONDS
+)
+
+
+def record_impressions(
+    user: User, post_ids: Iterable[int], viewed_at: datetime | None = None
+) -> None:
+    viewed_at = viewed_at or timezone.now()
+    post_ids = list(post_ids)
+    seen = _seen_cache.get(user.id)
+    if seen is not None:
+        seen.update(post_ids)
+    if ENV.IMPRESSION_BUFFER_ENABLED:
+        impression_buffer.add(user.id, post_ids, viewed_at)
+        return
+
+    Impression.objects.bulk_create(
+        [
+            Impression(user=user, post_id=post_id, viewed_at=viewed_at)
+            for post_id in post_ids
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "post"],
+        update_fields=["viewed_at"],
+    )
+
+
+def pending_impressions(user: User) -> dict[int, datetime]:
+    if not ENV.IMPRESSION_BUFFER_ENABLED:
+        return {}
+    return impression_buffer.pending_for(user.id)
+
+
+def seen_posts(user: User) -> SeenSet:
+    seen = _seen_cache.get(user.id)
+    if seen is not None:
+        metrics.incr("impressions.seen_cache_hits")
+        return seen
+
+    metrics.incr("impressions.seen_cache_misses")
+    seen = SeenSet(
+        Impression.objects.filter(user=user)
+        .values_list("post_id", flat=True)
+        .iterator()
+    )
+    seen.update(pending_impressions(user))
+    _seen_cache.set(user.id, seen)
+    return seen
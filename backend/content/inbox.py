@@ -0,0 +1,161 @@
+import logging
+import queue
+import threading
+from uuid import UUID
+
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from content.models import Follow
+from content.models import InboxEntry
+from content.models import Post
+from core.metrics import metrics
+from project.env import ENV
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+PULL_AUTHORS_CACHE_KEY = "content.inbox.pull_authors"
+PULL_AUTHORS_CACHE_SECONDS = 300
+FANOUT_BATCH_SIZE = 1000
+
+
+def pull_author_ids() -> set[UUID]:
+    authors: set[UUID] | None = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if authors is None:
+        authors = set(
+            User.objects.filter(
+                followers_count__gt=ENV.FANOUT_MAX_FOLLOWERS
+            ).values_list("id", flat=True)
+        )
+        cache.set(PULL_AUTHORS_CACHE_KEY, authors, PULL_AUTHORS_CACHE_SECONDS)
+    return authors
+
+
+def fan_out_post(post: Post) -> int:
+    if post.author_id in pull_author_ids():
+        return 0
+
+    follower_ids = Follow.objects.filter(
+        following_id=post.author_id
+    ).values_list("follower_id", flat=True)
+    entries = [
+        InboxEntry(
+            user_id=follower_id,
+            post=post,
+            author_id=post.author_id,
+            posted_at=post.created_at,
+        )
+        for follower_id in follower_ids
+    ]
+    InboxEntry.objects.bulk_create(
+        entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+    return len(entries)
+
+
+class FanoutPool:
+    """Fans new posts out on a fixed pool of threads.
+
+    The queue is bounded; once it is full the caller fans the post out
+    itself, so a burst of posts slows posting down instead of piling up
+    threads or memory.
+    """
+
+    def __init__(self, workers: int, max_queued: int) -> None:
+        self.workers = workers
+        self._queue: queue.Queue[Post] = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, daemon=True, name=f"Inbox fan-out {i}"
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, post: Post) -> None:
+        self.start()
+        try:
+            self._queue.put_nowait(post)
+        except queue.Full:
+            metrics.incr("inbox.fanout_inline")
+            fan_out_post(post)
+        metrics.set_gauge("inbox.fanout_queued", self._queue.qsize())
+
+    def _run(self) -> None:
+        while True:
+            post = self._queue.get()
+            close_old_connections()
+            try:
+                fan_out_post(post)
+            except Exception:
+                logger.exception("Failed to fan out post %s", post.id)
+                metrics.incr("inbox.fanout_failures")
+
+
+fanout_pool = FanoutPool(
+    workers=ENV.INBOX_FANOUT_WORKERS, max_queued=ENV.INBOX_FANOUT_MAX_QUEUED
+)
+
+
+def fan_out_post_async(post: Post) -> None:
+    fanout_pool.submit(post)
+
+
+def backfill_inbox(user: User, author: User) -> None:
+    if author.id in pull_author_ids():
+        return
+    posts = Post.objects.filter(author=author).order_by("-created_at")[
+        : ENV.INBOX_BACKFILL_POSTS
+    ]
+    InboxEntry.objects.bulk_create(
+        [
+            InboxEntry(
+                user=user,
+                post_id=post_id,
+                author=author,
+                posted_at=created_at,
+            )
+            for post_id, created_at in posts.values_list("id", "created_at")
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def trim_inbox(user: User, author: User) -> None:
+    InboxEntry.objects.filter(user=user, author=author).delete()
+
+
+def friends_candidate_ids(user: User) -> list[int]:
+    limit = ENV.INBOX_READ_LIMIT
+    rows = list(
+        InboxEntry.objects.filter(user=user)
+        .order_by("-posted_at")
+        .values_list("post_id", "posted_at")[: limit + 1]
+    )
+    if len(rows) > limit:
+        # nothing past the read limit is ever shown again
+        InboxEntry.objects.filter(
+            user=user, posted_at__lt=rows[limit][1]
+        ).delete()
+    post_ids = [post_id for post_id, _ in rows[:limit]]
+
+    pull_authors = pull_author_ids()
+    if pull_authors:
+        followed_pull_authors = Follow.objects.filter(
+            follower=user, following_id__in=pull_authors
+        ).values_list("following_id", flat=True)
+        post_ids += (
+            Post.objects.filter(author_id__in=followed_pull_authors)
+            .order_by("-created_at")
+            .values_list("id", flat=True)[:limit]
+        )
+    return post_ids
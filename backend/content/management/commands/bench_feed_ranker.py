@@ -0,0 +1,66 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from content.feed import for_you_queryset
+from content.ranker import ForYouRanker
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Compare the SQL and NumPy For You rankers on real users"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        limit, repeat = options["limit"], options["repeat"]
+        users = list(User.objects.order_by("?")[: options["users"]])
+        ranker = ForYouRanker(ttl=float("inf"))
+
+        refresh = self._best(repeat, ranker.refresh)
+        self.stdout.write(
+            f"snapshot refresh: {refresh * 1000:.1f} ms"
+            f" ({len(ranker.snapshot())} posts)"
+        )
+
+        sql_total = numpy_total = 0.0
+        agree = total = 0
+        for user in users:
+            sql_ids: list[int] = []
+            numpy_ids: list[int] = []
+
+            def run_sql() -> None:
+                sql_ids[:] = for_you_queryset(user).values_list(
+                    "id", flat=True
+                )[:limit]
+
+            def run_numpy() -> None:
+                numpy_ids[:] = [
+                    post_id for post_id, _ in ranker.rank(user, limit)
+                ]
+
+            sql_total += self._best(repeat, run_sql)
+            numpy_total += self._best(repeat, run_numpy)
+            agree += len(set(sql_ids) & set(numpy_ids))
+            total += len(sql_ids)
+
+        count = max(len(users), 1)
+        self.stdout.write(
+            f"sql rank:   {sql_total / count * 1000:.2f} ms/user\n"
+            f"numpy rank: {numpy_total / count * 1000:.2f} ms/user\n"
+            f"top-{limit} overlap: {agree}/{total}"
+        )
+
+    @staticmethod
+    def _best(repeat: int, fn: Any) -> float:
+        best = float("inf")
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
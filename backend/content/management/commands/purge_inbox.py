@@ -0,0 +1,21 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from content.models import InboxEntry
+
+
+class Command(BaseCommand):
+    help = "Delete Friends feed inbox entries older than INBOX_MAX_AGE_DAYS"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        purged = InboxEntry.objects.purge_expired(
+            batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {purged} expired inbox entries")
+        )
@@ -0,0 +1,19 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from content.counters import reconcile_post_counters
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the denormalized engagement counters on Post"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        repaired = reconcile_post_counters(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired counters on {repaired} post(s)")
+        )
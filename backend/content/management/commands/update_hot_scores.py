@@ -0,0 +1,41 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import close_old_connections
+
+from content.counters import update_hot_scores
+
+
+class Command(BaseCommand):
+    help = "Fold new interactions into the time-decayed Post.hot_score"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute every post instead of applying deltas",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Keep running, waiting this many seconds between runs",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        rebuild = options["rebuild"]
+        while True:
+            updated = update_hot_scores(
+                rebuild=rebuild, batch_size=options["batch_size"]
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Updated hot score on {updated} post(s)")
+            )
+            if options["every"] <= 0:
+                return
+            rebuild = False
+            close_old_connections()
+            time.sleep(options["every"])
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicate_impressions(apps, schema_editor):
+    Impression = apps.get_model('content', 'Impression')
+    duplicates = (
+        Impression.objects.values('user', 'post')
+        .annotate(rows=Count('id'), keep=Max('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        Impression.objects.filter(user=row['user'], post=row['post']).exclude(
+            id=row['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0008_post_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            drop_duplicate_impressions, migrations.RunPython.noop
+        ),
+        migrations.RemoveIndex(
+            model_name='impression',
+            name='content_imp_user_id_098bbe_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='impression',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_impression_user_post'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0009_impression_unique_user_post'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='impression',
+            name='viewed_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_POSTS = 50
+
+
+def backfill_inboxes(apps, schema_editor):
+    Follow = apps.get_model('content', 'Follow')
+    Post = apps.get_model('content', 'Post')
+    InboxEntry = apps.get_model('content', 'InboxEntry')
+    recent_posts = {}
+    for follower_id, author_id in Follow.objects.values_list(
+        'follower_id', 'following_id'
+    ).iterator():
+        if author_id not in recent_posts:
+            recent_posts[author_id] = list(
+                Post.objects.filter(author_id=author_id)
+                .order_by('-created_at')
+                .values_list('id', 'created_at')[:BACKFILL_POSTS]
+            )
+        InboxEntry.objects.bulk_create(
+            [
+                InboxEntry(
+                    user_id=follower_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    posted_at=created_at,
+                )
+                for post_id, created_at in recent_posts[author_id]
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0010_alter_impression_viewed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('posted_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='content.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['user', '-posted_at'], name='content_inb_user_id_d61fbd_idx'), models.Index(fields=['user', 'author'], name='content_inb_user_id_0ae624_idx')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(backfill_inboxes, migrations.RunPython.noop),
+    ]
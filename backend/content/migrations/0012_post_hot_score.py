@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:17
+
+import content.hot
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_hot_scores(apps, schema_editor):
+    Post = apps.get_model('content', 'Post')
+    JobCheckpoint = apps.get_model('content', 'JobCheckpoint')
+    interactions = {
+        'likes_count': apps.get_model('content', 'Like'),
+        'comments_count': apps.get_model('content', 'Comment'),
+        'saves_count': apps.get_model('content', 'Save'),
+        'shares_count': apps.get_model('content', 'Share'),
+    }
+    now = timezone.now()
+    scores = {}
+    for post_id, created_at in Post.objects.values_list('id', 'created_at').iterator():
+        scores[post_id] = content.hot.hot_term(content.hot.HOT_SCORE_SEED_WEIGHT, created_at)
+    for field, model in interactions.items():
+        weight = content.hot.HOT_SCORE_WEIGHTS[field]
+        rows = model.objects.filter(created_at__lte=now).values_list('post_id', 'created_at')
+        for post_id, created_at in rows.iterator():
+            scores[post_id] = content.hot.add_hot(scores[post_id], content.hot.hot_term(weight, created_at))
+    Post.objects.bulk_update(
+        [Post(id=post_id, hot_score=score) for post_id, score in scores.items()],
+        ['hot_score'],
+        batch_size=1000,
+    )
+    JobCheckpoint.objects.update_or_create(name='hot_score', defaults={'last_run_at': now})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0011_inboxentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(db_index=True, default=content.hot.initial_hot_score),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+    ]
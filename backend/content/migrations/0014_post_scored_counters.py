@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_scored(apps, schema_editor):
+    # hot_score already counts every interaction (0012 and the job since)
+    Post = apps.get_model('content', 'Post')
+    Post.objects.update(
+        scored_likes_count=models.F('likes_count'),
+        scored_comments_count=models.F('comments_count'),
+        scored_saves_count=models.F('saves_count'),
+        scored_shares_count=models.F('shares_count'),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0013_follow_keyset_indexes'),
+        ('users', '0007_otp_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcheckpoint',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='scored_comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='scored_likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='scored_saves_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='scored_shares_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_scored, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(models.Q(('likes_count', models.F('scored_likes_count')), _negated=True), models.Q(('comments_count', models.F('scored_comments_count')), _negated=True), models.Q(('saves_count', models.F('scored_saves_count')), _negated=True), models.Q(('shares_count', models.F('scored_shares_count')), _negated=True), _connector='OR'), fields=['id'], name='content_post_hot_stale_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+
+import content.hot
+from django.db import migrations, models
+
+
+def backfill_counter_sums(apps, schema_editor):
+    # same scan as 0012, kept per counter so removals can be scaled off
+    Post = apps.get_model('content', 'Post')
+    interactions = {
+        'likes_count': ('hot_likes', apps.get_model('content', 'Like')),
+        'comments_count': ('hot_comments', apps.get_model('content', 'Comment')),
+        'saves_count': ('hot_saves', apps.get_model('content', 'Save')),
+        'shares_count': ('hot_shares', apps.get_model('content', 'Share')),
+    }
+    sums = {}
+    counts = {}
+    for field, (hot, model) in interactions.items():
+        weight = content.hot.HOT_SCORE_WEIGHTS[field]
+        for post_id, created_at in model.objects.values_list('post_id', 'created_at').iterator():
+            term = content.hot.hot_term(weight, created_at)
+            key = (post_id, field)
+            sums[key] = term if key not in sums else content.hot.add_hot(sums[key], term)
+            counts[key] = counts.get(key, 0) + 1
+    posts = []
+    for post in Post.objects.only('id', 'created_at').iterator():
+        score = content.hot.hot_term(content.hot.HOT_SCORE_SEED_WEIGHT, post.created_at)
+        for field, (hot, _) in interactions.items():
+            term = sums.get((post.id, field))
+            setattr(post, hot, term)
+            setattr(post, f'scored_{field}', counts.get((post.id, field), 0))
+            if term is not None:
+                score = content.hot.add_hot(score, term)
+        post.hot_score = score
+        posts.append(post)
+    Post.objects.bulk_update(
+        posts,
+        ['hot_score', *(hot for hot, _ in interactions.values()), *(f'scored_{field}' for field in interactions)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0014_post_scored_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_comments',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_likes',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_saves',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_shares',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_counter_sums, migrations.RunPython.noop),
+    ]
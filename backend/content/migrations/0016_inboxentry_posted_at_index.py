@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0015_post_hot_counter_sums'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inboxentry',
+            index=models.Index(fields=['posted_at'], name='content_inb_posted__df9e19_idx'),
+        ),
+    ]
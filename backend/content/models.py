@@ -1,13 +1,26 @@
 import uuid
+from datetime import datetime
+from datetime import timedelta
 from typing import Any
 
+from content.hot import initial_hot_score
 from core.models import BaseModel
 from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.utils import timezone
+from project.env import ENV
 from users.models import Theme, User
 
 media_storage = FileSystemStorage(location="media")
 
+# posts whose counters moved since update_hot_scores last scored them
+HOT_SCORE_STALE = (
+    ~models.Q(likes_count=models.F("scored_likes_count"))
+    | ~models.Q(comments_count=models.F("scored_comments_count"))
+    | ~models.Q(saves_count=models.F("scored_saves_count"))
+    | ~models.Q(shares_count=models.F("scored_shares_count"))
+)
+
 
 class Post(BaseModel):
     author: models.ForeignKey[
@@ -33,6 +46,56 @@ class Post(BaseModel):
     ai_captioned: models.BooleanField[bool, bool] = models.BooleanField(
         default=False, null=True, blank=True
     )
+    likes_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    comments_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    saves_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    shares_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    hot_score: models.FloatField[float, float] = models.FloatField(
+        default=initial_hot_score, db_index=True
+    )
+    # log of each counter's decayed weight in hot_score, None while empty
+    hot_likes: models.FloatField[float | None, float | None] = (
+        models.FloatField(null=True, blank=True)
+    )
+    hot_comments: models.FloatField[float | None, float | None] = (
+        models.FloatField(null=True, blank=True)
+    )
+    hot_saves: models.FloatField[float | None, float | None] = (
+        models.FloatField(null=True, blank=True)
+    )
+    hot_shares: models.FloatField[float | None, float | None] = (
+        models.FloatField(null=True, blank=True)
+    )
+    # the counters as of the last update_hot_scores run
+    scored_likes_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    scored_comments_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    scored_saves_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    scored_shares_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=HOT_SCORE_STALE,
+                name="content_post_hot_stale_idx",
+            ),
+        ]
 
     def media(self) -> str:
         if self.media_file:
@@ -55,6 +118,10 @@ class Follow(BaseModel):
 
     class Meta(BaseModel.Meta):
         unique_together = ("follower", "following")
+        indexes = [
+            models.Index(fields=["following", "-created_at", "-id"]),
+            models.Index(fields=["follower", "-created_at", "-id"]),
+        ]
 
 
 class Like(BaseModel):
@@ -126,11 +193,102 @@ class Impression(BaseModel):
         Post,
     ] = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="impressions")
     viewed_at: models.DateTimeField[str, str] = models.DateTimeField(
-        auto_now_add=True, null=True, blank=True
+        default=timezone.now, null=True, blank=True
     )
 
     class Meta(BaseModel.Meta):
         indexes = [
-            models.Index(fields=["user", "post"]),
             models.Index(fields=["user", "viewed_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_impression_user_post"
+            ),
+        ]
+
+
+class FeedCandidate(BaseModel):
+    user: models.ForeignKey[
+        User,
+        User,
+    ] = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="feed_candidates"
+    )
+    post: models.ForeignKey[
+        Post,
+        Post,
+    ] = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="feed_candidates"
+    )
+    rank: models.BigIntegerField[int, int] = models.BigIntegerField()
+    score: models.IntegerField[int, int] = models.IntegerField(default=0)
+
+    class Meta(BaseModel.Meta):
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(fields=["user", "rank"]),
+        ]
+
+
+class InboxEntryManager(models.Manager["InboxEntry"]):
+    def purge_expired(self, batch_size: int = 10000) -> int:
+        """Delete entries older than INBOX_MAX_AGE_DAYS in bounded chunks."""
+        cutoff = timezone.now() - timedelta(days=ENV.INBOX_MAX_AGE_DAYS)
+        purged = 0
+        while True:
+            ids = list(
+                self.filter(posted_at__lt=cutoff).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                return purged
+            purged += self.filter(id__in=ids).delete()[0]
+
+
+class InboxEntry(BaseModel):
+    user: models.ForeignKey[
+        User,
+        User,
+    ] = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="inbox_entries"
+    )
+    post: models.ForeignKey[
+        Post,
+        Post,
+    ] = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="inbox_entries"
+    )
+    author: models.ForeignKey[
+        User,
+        User,
+    ] = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    posted_at: models.DateTimeField[
+        datetime, datetime
+    ] = models.DateTimeField()
+
+    objects = InboxEntryManager()
+
+    class Meta(BaseModel.Meta):
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(fields=["user", "-posted_at"]),
+            models.Index(fields=["user", "author"]),
+            models.Index(fields=["posted_at"]),
+        ]
+
+
+class JobCheckpoint(models.Model):
+    name: models.CharField[str, str] = models.CharField(
+        max_length=50, unique=True
+    )
+    last_run_at: models.DateTimeField[
+        datetime | None, datetime | None
+    ] = models.DateTimeField(null=True, blank=True)
+    # set while a run holds the job; a run that dies releases it on expiry
+    locked_until: models.DateTimeField[
+        datetime | None, datetime | None
+    ] = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.last_run_at}"
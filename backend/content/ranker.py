@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from typing import Iterable
+from typing import Iterator
+from uuid import UUID
+
+import numpy as np
+
+from content.models import Post
+from core.metrics import metrics
+from core.snapshot import PeriodicSnapshot
+from project.env import ENV
+from users.models import User
+
+if not hasattr(np, "bitwise_count"):
+    raise ImportError("the numpy ranker needs numpy>=2 (the ranker extra)")
+
+
+@dataclass
+class RankerSnapshot:
+    """Columnar copy of the newest posts, ordered newest first."""
+
+    post_ids: np.ndarray
+    author_codes: np.ndarray
+    genders: np.ndarray
+    body_types: np.ndarray
+    heights: np.ndarray
+    weights: np.ndarray
+    theme_masks: np.ndarray
+    engagement: np.ndarray
+    author_index: dict[UUID, int]
+    body_type_index: dict[str, int]
+    theme_index: dict[int, int]
+
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+    def theme_mask(self, theme_ids: Iterable[int]) -> np.ndarray:
+        mask = np.zeros(self.theme_masks.shape[1], dtype=np.uint64)
+        for theme_id in theme_ids:
+            bit = self.theme_index.get(theme_id)
+            if bit is not None:
+                mask[bit >> 6] |= np.uint64(1 << (bit & 63))
+        return mask
+
+
+def build_ranker_snapshot(limit: int | None = None) -> RankerSnapshot:
+    rows = list(
+        Post.objects.order_by("-created_at").values_list(
+            "id",
+            "author_id",
+            "author__gender",
+            "author__body_type",
+            "author__height",
+            "author__weight",
+            "likes_count",
+            "comments_count",
+            "shares_count",
+            "saves_count",
+        )[: limit or ENV.FEED_RANKER_SNAPSHOT_SIZE]
+    )
+    n = len(rows)
+    author_index: dict[UUID, int] = {}
+    body_type_index: dict[str, int] = {}
+    post_ids = np.empty(n, dtype=np.int64)
+    author_codes = np.empty(n, dtype=np.int32)
+    genders = np.empty(n, dtype="U1")
+    body_types = np.full(n, -1, dtype=np.int32)
+    heights = np.full(n, np.nan, dtype=np.float32)
+    weights = np.full(n, np.nan, dtype=np.float32)
+    engagement = np.empty(n, dtype=np.int64)
+    for i, row in enumerate(rows):
+        post_id, author_id, gender, body_type, height, weight = row[:6]
+        likes, comments, shares, saves = row[6:]
+        post_ids[i] = post_id
+        author_codes[i] = author_index.setdefault(author_id, len(author_index))
+        genders[i] = gender
+        if body_type:
+            body_types[i] = body_type_index.setdefault(
+                body_type, len(body_type_index)
+            )
+        if height is not None:
+            heights[i] = height
+        if weight is not None:
+            weights[i] = weight
+        engagement[i] = likes * 3 + comments * 5 + shares * 7 + saves * 4
+
+    row_index = {int(post_id): i for i, post_id in enumerate(post_ids)}
+    links = (
+        Post.themes.through.objects.filter(
+            post_id__gte=int(post_ids.min()) if n else 0
+        )
+        .values_list("post_id", "theme_id")
+        .iterator()
+    )
+    theme_index: dict[int, int] = {}
+    pairs: list[tuple[int, int]] = []
+    for post_id, theme_id in links:
+        i = row_index.get(post_id)
+        if i is not None:
+            pairs.append(
+                (i, theme_index.setdefault(theme_id, len(theme_index)))
+            )
+
+    theme_masks = np.zeros((n, max(1, -(-len(theme_index) // 64))), np.uint64)
+    if pairs:
+        rows_, bits = np.array(pairs, dtype=np.int64).T
+        np.bitwise_or.at(
+            theme_masks,
+            (rows_, bits >> 6),
+            np.left_shift(np.uint64(1), (bits & 63).astype(np.uint64)),
+        )
+
+    return RankerSnapshot(
+        post_ids=post_ids,
+        author_codes=author_codes,
+        genders=genders,
+        body_types=body_types,
+        heights=heights,
+        weights=weights,
+        theme_masks=theme_masks,
+        engagement=engagement,
+        author_index=author_index,
+        body_type_index=body_type_index,
+        theme_index=theme_index,
+    )
+
+
+def score_snapshot(snapshot: RankerSnapshot, user: User) -> np.ndarray:
+    """Same formula as ``for_you_queryset``; -1 marks ineligible rows."""
+    theme_match = np.bitwise_count(
+        snapshot.theme_masks
+        & snapshot.theme_mask(user.themes.values_list("id", flat=True))
+    ).sum(axis=1, dtype=np.int64)
+    scores = theme_match * 10 + snapshot.engagement
+
+    body_type = snapshot.body_type_index.get(user.body_type or "")
+    if body_type is not None:
+        scores += np.where(snapshot.body_types == body_type, 1000, 0)
+    if user.height:
+        height = float(user.height)
+        scores += np.where(
+            (snapshot.heights >= height - 30)
+            & (snapshot.heights <= height + 30),
+            100,
+            0,
+        )
+    if user.weight:
+        weight = float(user.weight)
+        scores += np.where(
+            (snapshot.weights >= weight - 15)
+            & (snapshot.weights <= weight + 15),
+            50,
+            0,
+        )
+
+    eligible = snapshot.genders == user.gender
+    own = snapshot.author_index.get(user.id)
+    if own is not None:
+        eligible &= snapshot.author_codes != own
+    return np.where(eligible, scores, -1)
+
+
+class ForYouRanker(PeriodicSnapshot[RankerSnapshot]):
+    """Scores For You candidates in memory from a periodically rebuilt snapshot."""
+
+    thread_name = "For you ranker refresh"
+
+    def build(self) -> RankerSnapshot:
+        with metrics.timer("feed.ranker_refresh"):
+            snapshot = build_ranker_snapshot()
+        metrics.set_gauge("feed.ranker_snapshot_size", len(snapshot))
+        return snapshot
+
+    def rank(
+        self, user: User, limit: int, exclude: Iterable[int] = ()
+    ) -> Iterator[tuple[int, int]]:
+        snapshot = self.snapshot()
+        with metrics.timer("feed.ranker_rank"):
+            scores = score_snapshot(snapshot, user)
+            excluded = np.fromiter(exclude, dtype=np.int64)
+            if len(excluded):
+                scores[np.isin(snapshot.post_ids, excluded)] = -1
+
+            # rows are newest first, so folding the position into the key
+            # breaks score ties by created_at like the SQL ordering does
+            n = len(scores)
+            keys = np.where(
+                scores >= 0, scores * n + (n - 1 - np.arange(n)), -1
+            )
+            limit = min(limit, int(np.count_nonzero(keys >= 0)))
+            if limit <= 0:
+                return iter(())
+            top = np.argpartition(keys, n - limit)[n - limit :]
+            top = top[np.argsort(keys[top])[::-1]]
+        return zip(
+            snapshot.post_ids[top].tolist(), scores[top].tolist(), strict=True
+        )
+
+
+for_you_ranker = ForYouRanker(ttl=ENV.FEED_RANKER_SNAPSHOT_SECONDS)
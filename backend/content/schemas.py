@@ -21,6 +21,11 @@ class PostSchema(Schema):
     saved: bool
 
 
+class FeedPageSchema(Schema):
+    posts: list[PostSchema]
+    next_cursor: str | None = None
+
+
 class CommentCreateSchema(Schema):
     post_id: int
     text: str
@@ -0,0 +1,61 @@
+from typing import Iterable
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+DENSE_AT = 4096
+
+
+class SeenSet:
+    """Roaring-style post id set.
+
+    Ids are split into 2**16 wide chunks. Sparse chunks are plain sets of
+    the low bits and switch to an 8 KiB bitmap once they pass DENSE_AT
+    members, so heavy viewers stay compact and lookups stay O(1).
+    """
+
+    def __init__(self, post_ids: Iterable[int] = ()) -> None:
+        self._chunks: dict[int, set[int] | bytearray] = {}
+        self._len = 0
+        for post_id in post_ids:
+            self.add(post_id)
+
+    def add(self, post_id: int) -> None:
+        high, low = post_id >> CHUNK_BITS, post_id & CHUNK_MASK
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            chunk = self._chunks[high] = set()
+
+        if isinstance(chunk, set):
+            if low in chunk:
+                return
+            chunk.add(low)
+            self._len += 1
+            if len(chunk) > DENSE_AT:
+                bitmap = bytearray((CHUNK_MASK + 1) >> 3)
+                for member in chunk:
+                    bitmap[member >> 3] |= 1 << (member & 7)
+                self._chunks[high] = bitmap
+            return
+
+        bit = 1 << (low & 7)
+        if not chunk[low >> 3] & bit:
+            chunk[low >> 3] |= bit
+            self._len += 1
+
+    def update(self, post_ids: Iterable[int]) -> None:
+        for post_id in post_ids:
+            self.add(post_id)
+
+    def __contains__(self, post_id: object) -> bool:
+        if not isinstance(post_id, int):
+            return False
+        chunk = self._chunks.get(post_id >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = post_id & CHUNK_MASK
+        if isinstance(chunk, set):
+            return low in chunk
+        return bool(chunk[low >> 3] & (1 << (low & 7)))
+
+    def __len__(self) -> int:
+        return self._len
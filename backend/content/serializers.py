@@ -0,0 +1,74 @@
+from collections import defaultdict
+from typing import Sequence
+
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Model
+
+from content.models import Like
+from content.models import Post
+from content.models import Save
+from content.schemas import PostSchema
+from users.models import User
+
+
+def _interacted(
+    model: type[Model], user: User | AnonymousUser, post_ids: list[int]
+) -> set[int]:
+    if not user.is_authenticated:
+        return set()
+    return set(
+        model._default_manager.filter(  # type:ignore
+            user=user, post_id__in=post_ids
+        ).values_list("post_id", flat=True)
+    )
+
+
+def serialize_posts(
+    user: User | AnonymousUser, posts: Sequence[Post]
+) -> list[PostSchema]:
+    """Serialize a page of posts with a fixed number of queries."""
+    if not posts:
+        return []
+    post_ids = [post.id for post in posts]
+
+    usernames = {
+        post.author_id: post.author.username
+        for post in posts
+        if Post.author.is_cached(post)  # type:ignore
+    }
+    missing = {post.author_id for post in posts} - usernames.keys()
+    if missing:
+        usernames.update(
+            User.objects.filter(id__in=missing).values_list("id", "username")
+        )
+
+    themes: defaultdict[int, list[str]] = defaultdict(list)
+    for post_id, name in (
+        Post.themes.through.objects.filter(post_id__in=post_ids)
+        .order_by("id")
+        .values_list("post_id", "theme__name")
+    ):
+        themes[post_id].append(name)
+
+    liked = _interacted(Like, user, post_ids)
+    saved = _interacted(Save, user, post_ids)
+
+    # values come straight from the database, skip pydantic validation
+    return [
+        PostSchema.model_construct(
+            id=post.id,
+            author_id=str(post.author_id),
+            author_username=usernames.get(post.author_id),
+            media_url=post.media(),
+            caption=post.caption,
+            themes=themes[post.id],
+            created_at=post.created_at,
+            likes_count=post.likes_count,
+            comments_count=post.comments_count,
+            saves_count=post.saves_count,
+            shares_count=post.shares_count,
+            liked=post.id in liked,
+            saved=post.id in saved,
+        )
+        for post in posts
+    ]
@@ -0,0 +1,28 @@
+from typing import Any
+from typing import cast
+
+from django.http import HttpRequest
+from ninja import Router
+
+from core.metrics import metrics
+from project.schemas import GenericResponse
+from users.auth import JWTAuth
+from users.models import User
+
+auth = JWTAuth()
+metrics_router = Router(tags=["Metrics"])
+
+
+@metrics_router.get(
+    "/",
+    response={
+        200: dict[str, Any],
+        403: GenericResponse,
+    },
+    auth=auth,
+)
+def get_metrics(request: HttpRequest):
+    user = cast(User, request.user)
+    if not user.is_staff:
+        return 403, GenericResponse(error="Metrics are only visible to staff")
+    return 200, metrics.snapshot()
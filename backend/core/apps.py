@@ -1,6 +1,32 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
+SERVER_COMMANDS = ("gunicorn", "uvicorn", "daphne", "hypercorn")
+
+
+def is_server_process() -> bool:
+    program = os.path.basename(sys.argv[0]) if sys.argv else ""
+    if program.startswith(SERVER_COMMANDS):
+        return True
+    # the autoreloader runs the actual server in a child with RUN_MAIN set
+    return (
+        program == "manage.py"
+        and sys.argv[1:2] == ["runserver"]
+        and (
+            "--noreload" in sys.argv or os.environ.get("RUN_MAIN") == "true"
+        )
+    )
+
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self) -> None:
+        if is_server_process():
+            from core.outbox import email_outbox
+
+            # deliver emails left pending by the previous process
+            email_outbox.start()
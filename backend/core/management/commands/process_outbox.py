@@ -0,0 +1,25 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from core.outbox import email_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send what is due and exit instead of running the workers",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["once"]:
+            sent = email_outbox.drain()
+            self.stdout.write(self.style.SUCCESS(f"Sent {sent} email(s)"))
+            return
+        email_outbox.start()
+        email_outbox.join()
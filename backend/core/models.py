@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from django.db import models
+from django.utils import timezone
 
 
 class BaseModel(models.Model):
@@ -11,3 +12,34 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class OutboxEmail(BaseModel):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        FAILED = "failed", "Failed"
+
+    subject: models.CharField[str, str] = models.CharField(max_length=255)
+    body: models.TextField[str, str] = models.TextField()
+    from_email: models.CharField[str, str | None] = models.CharField(
+        max_length=255, null=True, blank=True
+    )
+    recipients: models.JSONField = models.JSONField(default=list)
+    status: models.CharField[str, str] = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts: models.PositiveSmallIntegerField[int, int] = (
+        models.PositiveSmallIntegerField(default=0)
+    )
+    next_attempt_at: models.DateTimeField[
+        datetime, datetime
+    ] = models.DateTimeField(default=timezone.now)
+    last_error: models.TextField[str, str] = models.TextField(blank=True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} -> {', '.join(self.recipients)}"
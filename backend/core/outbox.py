@@ -0,0 +1,195 @@
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage
+from django.core.mail import get_connection
+from django.db import close_old_connections
+from django.db import transaction
+from django.utils import timezone
+
+from core.metrics import metrics
+from core.models import OutboxEmail
+from project.env import ENV
+
+logger = logging.getLogger(__name__)
+
+# a claimed email becomes due again if its worker dies mid-send
+CLAIM_LEASE = timedelta(seconds=60)
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 60 * 60
+
+
+class OutboxFull(Exception):
+    pass
+
+
+class EmailOutbox:
+    """Persistent email queue drained by a fixed pool of worker threads.
+
+    Each worker holds one mail backend connection open while there is work,
+    so a burst of emails shares a single SMTP/TLS handshake per worker.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        max_attempts: int,
+        batch_size: int,
+        poll_interval: float,
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def pending(self) -> int:
+        return OutboxEmail.objects.filter(
+            status=OutboxEmail.Status.PENDING
+        ).count()
+
+    def enqueue(
+        self,
+        subject: str,
+        body: str,
+        recipients: list[str],
+        from_email: str | None = None,
+    ) -> OutboxEmail:
+        depth = self.pending()
+        metrics.set_gauge("email.outbox_depth", depth)
+        if depth >= self.max_pending:
+            metrics.incr("email.rejected")
+            raise OutboxFull(f"{depth} emails are already waiting")
+
+        email = OutboxEmail.objects.create(
+            subject=subject,
+            body=body,
+            recipients=recipients,
+            from_email=from_email,
+        )
+        self.start()
+        transaction.on_commit(self._wakeup.set)
+        return email
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, daemon=True, name=f"Email outbox {i}"
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _claim(self) -> list[OutboxEmail]:
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now
+                )
+                .order_by("next_attempt_at")[: self.batch_size]
+            )
+            if emails:
+                OutboxEmail.objects.filter(
+                    id__in=[email.id for email in emails]
+                ).update(next_attempt_at=now + CLAIM_LEASE)
+        return emails
+
+    def _failed(self, email: OutboxEmail, error: Exception) -> None:
+        email.attempts += 1
+        email.last_error = repr(error)
+        if email.attempts >= self.max_attempts:
+            email.status = OutboxEmail.Status.FAILED
+            metrics.incr("email.dead")
+            logger.error("Giving up on email %s: %r", email.id, error)
+        else:
+            delay = min(
+                RETRY_BASE_SECONDS * 2 ** (email.attempts - 1),
+                RETRY_MAX_SECONDS,
+            )
+            email.next_attempt_at = timezone.now() + timedelta(
+                seconds=delay * random.uniform(0.8, 1.2)
+            )
+        email.save(
+            update_fields=[
+                "attempts",
+                "last_error",
+                "status",
+                "next_attempt_at",
+            ]
+        )
+
+    def drain(self) -> int:
+        """Send every email that is due; returns how many were delivered."""
+        sent = 0
+        connection = get_connection()
+        try:
+            while emails := self._claim():
+                for email in emails:
+                    start = time.perf_counter()
+                    try:
+                        # keeps the connection open across send() calls
+                        connection.open()
+                        EmailMessage(
+                            email.subject,
+                            email.body,
+                            email.from_email,
+                            email.recipients,
+                            connection=connection,
+                        ).send()
+                    except Exception as error:
+                        metrics.incr("email.failures")
+                        logger.warning(
+                            "Failed to send email %s: %r", email.id, error
+                        )
+                        connection.close()
+                        self._failed(email, error)
+                        continue
+                    finally:
+                        metrics.observe(
+                            "email.send", time.perf_counter() - start
+                        )
+                    email.delete()
+                    metrics.incr("email.sent")
+                    sent += 1
+        finally:
+            connection.close()
+            metrics.set_gauge("email.outbox_depth", self.pending())
+        return sent
+
+    def _run(self) -> None:
+        while True:
+            # waiting first keeps a pool started from AppConfig.ready() off
+            # the database until app loading has finished
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("Email outbox worker failed")
+
+
+email_outbox = EmailOutbox(
+    workers=ENV.EMAIL_OUTBOX_WORKERS,
+    max_pending=ENV.EMAIL_OUTBOX_MAX_PENDING,
+    max_attempts=ENV.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    batch_size=ENV.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=ENV.EMAIL_OUTBOX_POLL_SECONDS,
+)
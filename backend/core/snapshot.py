@@ -0,0 +1,107 @@
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from typing import Any
+from typing import Generic
+from typing import TypeVar
+
+from django.db import connection
+
+T = TypeVar("T")
+
+
+class PeriodicSnapshot(ABC, Generic[T]):
+    """An in-memory copy of database state rebuilt every ``ttl`` seconds.
+
+    The first read builds the snapshot in the caller's thread. After that
+    readers keep getting the current snapshot while a single daemon thread
+    builds its replacement once it goes stale.
+    """
+
+    thread_name = "Snapshot refresh"
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._value: T | None = None
+        self._built_at: float | None = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refreshing = False
+
+    @abstractmethod
+    def build(self) -> T:
+        """Read a fresh snapshot from the database."""
+
+    def _publish(self, value: T) -> None:
+        # callers hold self._lock
+        self._value = value
+        self._built_at = time.monotonic()
+
+    def refresh(self) -> T:
+        value = self.build()
+        with self._lock:
+            self._publish(value)
+        return value
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+            connection.close()
+
+    def snapshot(self) -> T:
+        value = self._value
+        if value is None:
+            with self._build_lock:
+                value = self._value
+                return self.refresh() if value is None else value
+        if time.monotonic() - (self._built_at or 0.0) > self.ttl:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(
+                        target=self._refresh_in_background,
+                        daemon=True,
+                        name=self.thread_name,
+                    ).start()
+        return value
+
+
+class JournaledSnapshot(PeriodicSnapshot[T]):
+    """A periodic snapshot that is also patched in place between rebuilds.
+
+    Changes reported through ``changed`` while a rebuild is reading are
+    journaled and replayed onto the new snapshot before it is published.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        super().__init__(ttl)
+        self._journal: list[Any] | None = None
+
+    @abstractmethod
+    def apply(self, value: T, change: Any) -> None:
+        """Patch ``value`` in place with a change passed to ``changed``."""
+
+    def _publish(self, value: T) -> None:
+        # replay changes made while the rebuild was reading
+        for change in self._journal or []:
+            self.apply(value, change)
+        super()._publish(value)
+
+    def refresh(self) -> T:
+        with self._lock:
+            self._journal = []
+        try:
+            return super().refresh()
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def changed(self, change: Any) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(change)
+            if self._value is not None:
+                self.apply(self._value, change)
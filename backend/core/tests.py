@@ -0,0 +1,75 @@
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+
+from core.models import OutboxEmail
+from core.outbox import EmailOutbox
+from core.outbox import OutboxFull
+
+
+def make_outbox(**kwargs) -> EmailOutbox:
+    # no worker threads: the tests drain synchronously
+    options = {
+        "workers": 0,
+        "max_pending": 10,
+        "max_attempts": 2,
+        "batch_size": 5,
+        "poll_interval": 60.0,
+    }
+    return EmailOutbox(**(options | kwargs))
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+)
+class EmailOutboxTests(TestCase):
+    def test_drain_sends_queued_emails(self) -> None:
+        outbox = make_outbox()
+        outbox.enqueue("Hello", "Body", ["a@example.com"])
+        outbox.enqueue("Again", "Body", ["b@example.com"], "me@example.com")
+
+        self.assertEqual(outbox.drain(), 2)
+        self.assertEqual(
+            [(m.subject, m.to) for m in mail.outbox],
+            [("Hello", ["a@example.com"]), ("Again", ["b@example.com"])],
+        )
+        self.assertEqual(mail.outbox[1].from_email, "me@example.com")
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_enqueue_rejects_when_full(self) -> None:
+        outbox = make_outbox(max_pending=1)
+        outbox.enqueue("Hello", "Body", ["a@example.com"])
+        with self.assertRaises(OutboxFull):
+            outbox.enqueue("Again", "Body", ["b@example.com"])
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_failed_send_backs_off_then_gives_up(self) -> None:
+        outbox = make_outbox()
+        email = outbox.enqueue("Hello", "Body", ["a@example.com"])
+        with mock.patch(
+            "core.outbox.EmailMessage.send", side_effect=SMTPException("down")
+        ):
+            self.assertEqual(outbox.drain(), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn("down", email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            # not due yet, so a second drain leaves it alone
+            self.assertEqual(outbox.drain(), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 1)
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(outbox.drain(), 0)
+            email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(mail.outbox, [])
+        # dead emails are not counted against the pending limit
+        self.assertEqual(outbox.pending(), 0)
@@ -1,18 +1,22 @@
 import os
 
-from channels.auth import AuthMiddlewareStack
-from channels.routing import ProtocolTypeRouter
-from channels.routing import URLRouter
 from django.core.asgi import get_asgi_application
 
-from chat.urls import websocket_urlpatterns
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
+# set up Django before anything below imports models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+
+from chat.urls import websocket_urlpatterns  # noqa: E402
+from users.auth import JWTAuthMiddleware  # noqa: E402
+
 application = ProtocolTypeRouter(
     {
-        "http": get_asgi_application(),
-        "websocket": AuthMiddlewareStack(
+        "http": django_asgi_app,
+        "websocket": JWTAuthMiddleware(
             URLRouter(websocket_urlpatterns)  # type: ignore[arg-type] if needed
         ),
     }
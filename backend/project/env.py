@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 from secrets import token_urlsafe
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -19,12 +20,68 @@ class Environment(BaseSettings):
     SECRET_KEY_FILE: Path | None = None
     # login
     OTP_LENGTH: int = 5
+    OTP_TTL_MINUTES: int = 5
     # auth token
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_DAYS: int = 30
+    # authenticated user cache: "local", "shared" (Django cache) or "off"
+    USER_CACHE_BACKEND: Literal["local", "shared", "off"] = "local"
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    # verified JWT claims, keyed by token digest
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    # public profile payloads, dropped on profile, theme, follow and post changes
+    PROFILE_CACHE_SECONDS: int = 300
     SMTP_PASSWORD: str | None = None
     SMTP_EMAIL: str | None = None
+    EMAIL_BACKEND: str = "django.core.mail.backends.smtp.EmailBackend"
+    # persistent email outbox
+    EMAIL_OUTBOX_WORKERS: int = 2
+    EMAIL_OUTBOX_MAX_PENDING: int = 10000
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
     GEMINI_API_KEY: str = ""
+    # for you feed candidate queue
+    FOR_YOU_QUEUE_SIZE: int = 200
+    FOR_YOU_QUEUE_REFILL_AT: int = 20
+    FOR_YOU_QUEUE_TTL_MINUTES: int = 60
+    # "numpy" scores candidates in memory instead of in SQL
+    FEED_RANKER: Literal["sql", "numpy"] = "sql"
+    FEED_RANKER_SNAPSHOT_SIZE: int = 200000
+    FEED_RANKER_SNAPSHOT_SECONDS: float = 60.0
+    # write-behind impression buffer
+    IMPRESSION_BUFFER_ENABLED: bool = True
+    IMPRESSION_BUFFER_MAX_SIZE: int = 500
+    IMPRESSION_BUFFER_FLUSH_SECONDS: float = 2.0
+    # oldest impressions are dropped past this while flushes keep failing
+    IMPRESSION_BUFFER_MAX_PENDING: int = 50000
+    SEEN_SET_CACHE_SIZE: int = 10000
+    SEEN_SET_TTL_SECONDS: float = 60.0
+    # friends feed inbox
+    FANOUT_MAX_FOLLOWERS: int = 10000
+    INBOX_BACKFILL_POSTS: int = 50
+    INBOX_READ_LIMIT: int = 500
+    INBOX_MAX_AGE_DAYS: int = 30
+    INBOX_FANOUT_WORKERS: int = 2
+    # posts are fanned out inline by the request once this many are waiting
+    INBOX_FANOUT_MAX_QUEUED: int = 1000
+    # explore feed sampler
+    EXPLORE_SNAPSHOT_SIZE: int = 50000
+    EXPLORE_SNAPSHOT_SECONDS: float = 60.0
+    EXPLORE_SAMPLE_ATTEMPTS: int = 20
+    # time-decayed engagement
+    HOT_SCORE_HALF_LIFE_HOURS: float = 24.0
+    # follow graph used for mutual-follow checks
+    SOCIAL_GRAPH_BACKEND: Literal["local", "shared"] = "local"
+    SOCIAL_GRAPH_RESYNC_SECONDS: float = 300.0
+    # "people like me" suggestions
+    SIMILAR_USERS_REFRESH_SECONDS: float = 300.0
+    SIMILAR_USERS_MAX_COUNT: int = 50
+    # websocket chat message batching
+    CHAT_FLUSH_SECONDS: float = 0.02
+    CHAT_FLUSH_BATCH_SIZE: int = 500
 
 
 ENV = Environment()
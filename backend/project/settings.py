@@ -35,7 +35,7 @@ SECRET_KEY = secret_key
 DEBUG = ENV.DEBUG
 
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = ENV.EMAIL_BACKEND
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_USE_TLS = True
 EMAIL_PORT = 587
@@ -112,6 +112,12 @@ TEMPLATES: list[dict[str, Any]] = [
 
 WSGI_APPLICATION = "project.wsgi.application"
 
+# websocket consumers talk to each other through groups; in-process only,
+# swap for channels_redis when running more than one ASGI worker
+CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
@@ -122,6 +128,8 @@ def select_datebase():
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": f"{ENV.POSTGRES_DB}.db",
+            # background feed refills write concurrently with requests
+            "OPTIONS": {"transaction_mode": "IMMEDIATE"},
         }
     }
     if ENV.POSTGRES_PASSWORD_FILE:
@@ -14,6 +14,7 @@ from ninja import NinjaAPI
 
 from chat.api import chat_router
 from content.api import content_router
+from core.api import metrics_router
 from notifications.api import notifications_router
 from search.api import search_router
 from users.api import meta_router
@@ -30,6 +31,7 @@ api.add_router("/notifications", notifications_router)
 api.add_router("/chat", chat_router)
 api.add_router("/meta", meta_router)
 api.add_router("/follow", follow_router)
+api.add_router("/metrics", metrics_router)
 
 
 @api.exception_handler(IntegrityError)
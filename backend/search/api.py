@@ -2,9 +2,9 @@ from django.db.models import Count, Q
 from django.http import HttpRequest
 from ninja import Router
 
-from content.api import _get_post_with_interactions, _serialize_post
 from content.models import Post, Theme
 from content.schemas import PostSchema
+from content.serializers import serialize_posts
 from users.models import BodyType, User
 from users.schemas import ThemeModelSchema
 
@@ -55,13 +55,8 @@ def search_posts(request: HttpRequest, q: str = "", offset: int = 0, limit: int
 
         qs = Post.objects.filter(query).distinct().order_by("-created_at")
 
-    qs = qs[offset : offset + limit]
-    qs = qs.prefetch_related("themes", "author")
-    return_posts: list[PostSchema] = []
-    qs = _get_post_with_interactions(request.user, qs)
-    for post in list(qs):
-        return_posts.append(_serialize_post(request.user, post))
-    return return_posts
+    posts = list(qs.select_related("author")[offset : offset + limit])
+    return serialize_posts(request.user, posts)
 
 
 @search_router.get("/themes/", response=list[ThemeModelSchema])
@@ -1,23 +1,28 @@
 import logging
-from threading import Thread
-from typing import cast
+from typing import Any, cast
+from uuid import UUID
 
-from content.models import Follow, Post
-from django.core.mail import send_mail
+from content.feed import clear_for_you_queue
+from content.graph import social_graph
+from core.outbox import OutboxFull, email_outbox
+from django.db import transaction
 from django.http import HttpRequest
 from ninja import Router
 from project.env import ENV
 from project.schemas import GenericResponse
 from users.auth import JWTAuth, create_access_token
+from users.cache import cache_profile, cached_profile, user_theme_names
 from users.models import OTP, BodyType, Theme, User
 from users.schemas import (
     ExistsSchema,
     ProfileSchema,
     RequestOTPSchema,
+    SimilarUserSchema,
     TokenSchema,
     UpdateProfileSchema,
     VerifyOTPSchema,
 )
+from users.similar import similar_users
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +32,8 @@ profile_router = Router(tags=["Profile"])
 meta_router = Router(tags=["Meta"])
 
 
-# def send_mail(*a, **aa):
-#     pass
-
-
 def send_otp(identifier: str, code: str):
-    send_mail(
+    email_outbox.enqueue(
         "Your One-Time Password (OTP)",
         f"""
 Hello,
@@ -49,9 +50,8 @@ If you did not request this OTP, please ignore this email.
 Thank you,
 [Your Application/Service Name]
     """,
-        ENV.SMTP_EMAIL,
         [identifier],
-        fail_silently=False,
+        ENV.SMTP_EMAIL,
     )
     logger.warning(f"Sending OTP {code} to {identifier}")
 
@@ -61,6 +61,7 @@ Thank you,
     response={
         200: GenericResponse,
         404: GenericResponse,
+        503: GenericResponse,
     },
 )
 def request_otp(request: HttpRequest, payload: RequestOTPSchema):
@@ -69,13 +70,14 @@ def request_otp(request: HttpRequest, payload: RequestOTPSchema):
         return 404, GenericResponse(error="Email  is required")
 
     code = OTP.generate_code()
-    OTP.objects.create(identifier=identifier, code=code)
-    Thread(
-        target=send_otp,
-        args=(identifier, code),
-        daemon=False,
-        name="Otp thread",
-    ).start()
+    try:
+        with transaction.atomic():
+            OTP.objects.create(identifier=identifier, code=code)
+            send_otp(identifier, code)
+    except OutboxFull:
+        return 503, GenericResponse(
+            error="Too many pending emails, please try again shortly."
+        )
     return 200, GenericResponse(detail=f"OTP was sent to  '{identifier}'.")
 
 
@@ -85,6 +87,7 @@ def request_otp(request: HttpRequest, payload: RequestOTPSchema):
         200: TokenSchema,
         404: GenericResponse,
         409: GenericResponse,
+        410: GenericResponse,
     },
 )
 def verify_otp(request: HttpRequest, payload: VerifyOTPSchema):
@@ -99,6 +102,13 @@ def verify_otp(request: HttpRequest, payload: VerifyOTPSchema):
     except OTP.DoesNotExist:
         return 409, GenericResponse(**{"error": f"invalid OTP for '{identifier}'."})
 
+    # codes are single use; older ones for the same identifier go with it
+    deleted, _ = OTP.objects.filter(
+        identifier=identifier, created_at__lte=otp.created_at
+    ).delete()
+    if not deleted:
+        return 409, GenericResponse(**{"error": f"invalid OTP for '{identifier}'."})
+
     if otp.is_expired():
         return 410, GenericResponse(**{"error": "OTP expired"})
 
@@ -119,14 +129,9 @@ def check_user_exists(request: HttpRequest, payload: RequestOTPSchema):
     return 200, ExistsSchema(exists=exists, email=payload.email)
 
 
-@profile_router.get("/profile", response=ProfileSchema, auth=auth)
-def get_profile(request: HttpRequest):
-    user: User = cast(User, request.user)
-
-    followers_count = Follow.objects.filter(following=user).count()
-    following_count = Follow.objects.filter(follower=user).count()
-    posts_count = Post.objects.filter(author=user).count()
-
+def _profile_schema(
+    user: User, themes: list[str] | None = None, **extra: Any
+) -> ProfileSchema:
     return ProfileSchema(
         id=user.id,
         username=user.username,
@@ -136,14 +141,20 @@ def get_profile(request: HttpRequest):
         body_type=user.body_type,
         height=user.height,
         weight=user.weight,
-        themes=[t.name for t in user.themes.all()],
-        followers_count=followers_count,
-        following_count=following_count,
-        posts_count=posts_count,
-        gender=user.gender,
+        themes=user_theme_names(user) if themes is None else themes,
+        followers_count=user.followers_count,
+        following_count=user.following_count,
+        posts_count=user.posts_count,
+        **extra,
     )
 
 
+@profile_router.get("/profile", response=ProfileSchema, auth=auth)
+def get_profile(request: HttpRequest):
+    user: User = cast(User, request.user)
+    return _profile_schema(user, gender=user.gender)
+
+
 @profile_router.put("/profile", response=ProfileSchema, auth=auth)
 def update_profile(request: HttpRequest, payload: UpdateProfileSchema):
     _payload = payload.dict(
@@ -152,53 +163,61 @@ def update_profile(request: HttpRequest, payload: UpdateProfileSchema):
     )
 
     user: User = cast(User, request.user)
+    theme_names: list[str] | None = _payload.pop("themes", None)
 
-    theme_objs: list[Theme] = []
-    if "themes" in _payload:
-        for theme_name in payload.themes:
-            theme_objs.append(Theme.objects.get_or_create(name=theme_name)[0])
-            user.themes.set(theme_objs)
-        _payload.pop("themes")
+    with transaction.atomic():
+        if theme_names is not None:
+            themes = Theme.objects.resolve(theme_names)
+            user.themes.set(themes)
+            theme_names = [theme.name for theme in themes]
 
-    if "body_type" in _payload and payload.body_type:
-        BodyType.objects.get_or_create(name=payload.body_type)
+        if payload.body_type:
+            BodyType.objects.bulk_create(
+                [BodyType(name=payload.body_type)], ignore_conflicts=True
+            )
 
-    for attr, value in _payload.items():
-        setattr(user, attr, value)
-        user.save()
-    return get_profile(request)
+        for attr, value in _payload.items():
+            setattr(user, attr, value)
+        if _payload:
+            user.save(update_fields=list(_payload))
+
+    clear_for_you_queue(user)
+    return _profile_schema(user, themes=theme_names, gender=user.gender)
 
 
 @profile_router.get(
     "/profile/{user_id}/", response=ProfileSchema | GenericResponse, auth=auth
 )
 def get_user_by_id(request: HttpRequest, user_id: str):
-    user = User.objects.filter(id=user_id).first()
-    if not user:
+    try:
+        target_id = UUID(user_id)
+    except ValueError:
         return GenericResponse(detail="User not found")
 
-    followers_count = Follow.objects.filter(following=user).count()
-    following_count = Follow.objects.filter(follower=user).count()
-    posts_count = Post.objects.filter(author=user).count()
+    payload = cached_profile(target_id)
+    if payload is None:
+        user = User.objects.filter(id=target_id).first()
+        if not user:
+            return GenericResponse(detail="User not found")
+        payload = _profile_schema(user).dict(exclude={"is_following"})
+        cache_profile(target_id, payload)
+
     return ProfileSchema(
-        id=user.id,
-        username=user.username,
-        full_name=user.full_name,
-        bio=user.bio,
-        profile_picture=user.profile_picture,
-        body_type=user.body_type,
-        height=user.height,
-        weight=user.weight,
-        themes=[t.name for t in user.themes.all()],
-        followers_count=followers_count,
-        following_count=following_count,
-        posts_count=posts_count,
-        is_following=Follow.objects.filter(
-            follower=request.user, following=user
-        ).exists(),
+        **payload,
+        is_following=social_graph.follows(request.user.id, target_id),
     )
 
 
+@profile_router.get("/similar/", response=list[SimilarUserSchema], auth=auth)
+def list_similar_users(request: HttpRequest, count: int = 20):
+    user: User = cast(User, request.user)
+    count = max(1, min(count, ENV.SIMILAR_USERS_MAX_COUNT))
+    exclude = social_graph.following_ids(user.id) | {user.id}
+    user_ids = similar_users.similar(user, count, exclude)
+    users = User.objects.only(*SimilarUserSchema.model_fields).in_bulk(user_ids)
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+
 @meta_router.get("/bodytypes/", response=list[str])
 def list_bodytypes(request: HttpRequest):
     bodytypes = BodyType.objects.values_list("name", flat=True)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
+
+    def ready(self) -> None:
+        from users import cache  # noqa: F401  # connects invalidation signals
+        from users import similar  # noqa: F401  # keeps the index current
@@ -1,16 +1,31 @@
+import hashlib
+import time
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
+from typing import Any
+from urllib.parse import parse_qs
 
 import jwt
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
 from django.http import HttpRequest
 from ninja.security import HttpBearer
 
+from core.cache import TTLCache
+from core.metrics import metrics
 from project.env import ENV
+from users.cache import user_cache
 from users.models import User
 
 SECRET_KEY = ENV.SECRET_KEY.encode()
 
+# sha256(token) -> verified claims, never kept past the token's exp
+token_cache: TTLCache[bytes, dict[str, Any]] = TTLCache(
+    maxsize=ENV.TOKEN_CACHE_SIZE, ttl=ENV.TOKEN_CACHE_TTL_SECONDS
+)
+
 
 def create_access_token(*, sub: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(
@@ -23,12 +38,77 @@ def create_access_token(*, sub: str) -> str:
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict[str, Any]:
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is not None:
+        metrics.incr("auth.token_cache_hits")
+        return dict(claims)
+
+    metrics.incr("auth.token_cache_misses")
+    claims = jwt.decode(  # type:ignore
+        token, SECRET_KEY, algorithms=[ENV.ALGORITHM]
+    )
+    ttl = token_cache.ttl
+    if "exp" in claims:
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(digest, dict(claims), ttl=ttl)
+    return claims
+
+
+def user_for_token(token: str) -> User:
+    payload = decode_access_token(token)
+    user_id = payload.get("sub")
+    user = user_cache.get(user_id)
+    if user is None:
+        user = User.objects.get(id=user_id)
+        user_cache.set(user_id, user)
+    return user
+
+
 class JWTAuth(HttpBearer):
     def authenticate(self, request: HttpRequest, token: str):
-        payload = jwt.decode(  # type:ignore
-            token, SECRET_KEY, algorithms=[ENV.ALGORITHM]
-        )
-        user_id = payload.get("sub")
-        user = User.objects.get(id=user_id)
+        with metrics.timer("auth.authenticate"):
+            user = user_for_token(token)
         request.user = user
         return user
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Resolves ``scope["user"]`` from the same bearer token the API takes.
+
+    The token comes from an ``Authorization: Bearer`` header, a ``token``
+    query parameter, or the subprotocol pair ``bearer, <token>`` for
+    browsers, which cannot set headers on a websocket. The user is looked
+    up once per connection, without sessions or cookies.
+    """
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any):
+        scope = dict(scope)
+        token = self.get_token(scope)
+        scope["user"] = AnonymousUser()
+        if token:
+            try:
+                scope["user"] = await database_sync_to_async(user_for_token)(
+                    token
+                )
+            except (jwt.InvalidTokenError, User.DoesNotExist, ValueError):
+                metrics.incr("auth.websocket_rejected")
+        return await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def get_token(scope: dict[str, Any]) -> str | None:
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode().partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    return token
+        query = parse_qs(scope.get("query_string", b"").decode())
+        if query.get("token"):
+            return query["token"][0]
+        subprotocols = scope.get("subprotocols") or []
+        if len(subprotocols) >= 2 and subprotocols[0] == "bearer":
+            scope["auth_subprotocol"] = "bearer"
+            return subprotocols[1]
+        return None
@@ -0,0 +1,132 @@
+import copy
+from typing import Any
+from uuid import UUID
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.cache import TTLCache
+from core.metrics import metrics
+from project.env import ENV
+from users.models import User
+
+USER_CACHE_KEY = "users.user.{}"
+THEMES_CACHE_KEY = "users.themes.{}"
+THEMES_CACHE_SECONDS = 300
+PROFILE_CACHE_KEY = "users.profile.{}"
+
+
+class UserCache:
+    """Caches authenticated users by id.
+
+    ``local`` keeps instances in this process only, so other workers may
+    serve a stale user for up to USER_CACHE_TTL_SECONDS after a change.
+    ``shared`` goes through the Django cache (point CACHES at redis or
+    memcached) so an invalidation is seen by every worker. Callers always
+    get their own copy and may modify it freely.
+    """
+
+    def __init__(self, backend: str, maxsize: int, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._local: TTLCache[str, User] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: str) -> User | None:
+        if self.backend == "shared":
+            user = cache.get(USER_CACHE_KEY.format(user_id))
+        elif self.backend == "local":
+            user = self._local.get(user_id)
+            user = copy.copy(user) if user is not None else None
+        else:
+            return None
+        metrics.incr(
+            "auth.user_cache_hits" if user else "auth.user_cache_misses"
+        )
+        return user
+
+    def set(self, user_id: str, user: User) -> None:
+        if self.backend == "shared":
+            cache.set(USER_CACHE_KEY.format(user_id), user, self.ttl)
+        elif self.backend == "local":
+            self._local.set(user_id, copy.copy(user))
+
+    def invalidate(self, user_id: str) -> None:
+        if self.backend == "shared":
+            cache.delete(USER_CACHE_KEY.format(user_id))
+        self._local.delete(user_id)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+
+user_cache = UserCache(
+    backend=ENV.USER_CACHE_BACKEND,
+    maxsize=ENV.USER_CACHE_SIZE,
+    ttl=ENV.USER_CACHE_TTL_SECONDS,
+)
+
+
+def user_theme_names(user: User) -> list[str]:
+    key = THEMES_CACHE_KEY.format(user.pk)
+    names: list[str] | None = cache.get(key)
+    if names is None:
+        names = list(user.themes.values_list("name", flat=True))
+        cache.set(key, names, THEMES_CACHE_SECONDS)
+    return names
+
+
+def cached_profile(user_id: UUID) -> dict[str, Any] | None:
+    payload: dict[str, Any] | None = cache.get(
+        PROFILE_CACHE_KEY.format(user_id)
+    )
+    metrics.incr(
+        "users.profile_cache_hits"
+        if payload is not None
+        else "users.profile_cache_misses"
+    )
+    return payload
+
+
+def cache_profile(user_id: UUID, payload: dict[str, Any]) -> None:
+    cache.set(
+        PROFILE_CACHE_KEY.format(user_id), payload, ENV.PROFILE_CACHE_SECONDS
+    )
+
+
+def forget_user(user_id: UUID | str) -> None:
+    user_cache.invalidate(str(user_id))
+    cache.delete_many(
+        [
+            THEMES_CACHE_KEY.format(user_id),
+            PROFILE_CACHE_KEY.format(user_id),
+        ]
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _invalidate_user(sender: type[User], instance: User, **kwargs: Any):
+    forget_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.themes.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def _invalidate_user_relations(
+    sender: type,
+    instance: Any,
+    action: str,
+    reverse: bool,
+    pk_set: set[Any] | None,
+    **kwargs: Any,
+):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        forget_user(instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            forget_user(pk)
@@ -1,16 +1,104 @@
+from datetime import datetime
+from typing import Literal
 from typing import cast
 
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
 from django.http import HttpRequest
 from ninja import Router
+from ninja.errors import ValidationError
 
+from content.counters import bump_user_counter
+from content.inbox import backfill_inbox
+from content.inbox import trim_inbox
 from content.models import Follow
 from project.schemas import GenericResponse
 from users.auth import JWTAuth
 from users.models import User
+from users.schemas import FollowPageSchema
+from users.schemas import FollowUserSchema
 
 follow_router = Router(tags=["Follow"])
 auth = JWTAuth()
 
+FOLLOW_CURSOR_SALT = "users.follow.cursor"
+MAX_FOLLOW_PAGE_SIZE = 100
+
+
+def _encode_cursor(created_at: datetime, follow_id: int) -> str:
+    return signing.dumps(
+        [created_at.isoformat(), follow_id], salt=FOLLOW_CURSOR_SALT
+    )
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, follow_id = signing.loads(cursor, salt=FOLLOW_CURSOR_SALT)
+        return datetime.fromisoformat(created_at), int(follow_id)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise ValidationError([{"detail": "Invalid cursor"}])
+
+
+def _follow_page(
+    user_id: str,
+    side: Literal["follower", "following"],
+    count: int,
+    cursor: str | None,
+) -> FollowPageSchema:
+    target = (
+        User.objects.filter(id=user_id)
+        .only("followers_count", "following_count")
+        .first()
+    )
+    if not target:
+        return FollowPageSchema(users=[], total=0)
+
+    # list the other end of each edge: followers of target, or whom it follows
+    other = "following" if side == "follower" else "follower"
+    qs = Follow.objects.filter(**{other: target})
+    if cursor:
+        created_at, follow_id = _decode_cursor(cursor)
+        qs = qs.filter(
+            Q(created_at__lt=created_at)
+            | Q(created_at=created_at, id__lt=follow_id)
+        )
+    count = max(1, min(count, MAX_FOLLOW_PAGE_SIZE))
+    rows = list(
+        qs.order_by("-created_at", "-id").values(
+            "id",
+            "created_at",
+            user_id=F(f"{side}__id"),
+            username=F(f"{side}__username"),
+            full_name=F(f"{side}__full_name"),
+            profile_picture=F(f"{side}__profile_picture"),
+        )[: count + 1]
+    )
+    page = rows[:count]
+    return FollowPageSchema(
+        users=[
+            FollowUserSchema(
+                id=row["user_id"],
+                username=row["username"],
+                full_name=row["full_name"],
+                profile_picture=row["profile_picture"],
+                followed_at=row["created_at"],
+            )
+            for row in page
+        ],
+        total=(
+            target.followers_count
+            if side == "follower"
+            else target.following_count
+        ),
+        next_cursor=(
+            _encode_cursor(page[-1]["created_at"], page[-1]["id"])
+            if len(rows) > count
+            else None
+        ),
+    )
+
 
 @follow_router.post("/follow/{user_id}/", response=GenericResponse, auth=auth)
 def follow_user(request: HttpRequest, user_id: str):
@@ -21,7 +109,15 @@ def follow_user(request: HttpRequest, user_id: str):
     if target == user:
         return GenericResponse(detail="Cannot follow yourself")
 
-    Follow.objects.get_or_create(follower=user, following=target)
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(
+            follower=user, following=target
+        )
+        if created:
+            bump_user_counter(user.id, "following_count", 1)
+            bump_user_counter(target.id, "followers_count", 1)
+    if created:
+        backfill_inbox(user, target)
     return GenericResponse(detail=f"You are now following {target.id}")
 
 
@@ -32,11 +128,20 @@ def unfollow_user(request: HttpRequest, user_id: str):
     if not target:
         return GenericResponse(detail="User not found")
 
-    Follow.objects.filter(follower=user, following=target).delete()
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower=user, following=target
+        ).delete()
+        if deleted:
+            bump_user_counter(user.id, "following_count", -1)
+            bump_user_counter(target.id, "followers_count", -1)
+    trim_inbox(user, target)
     return GenericResponse(detail=f"You unfollowed {target.id}")
 
 
-@follow_router.get("/followers/{user_id}/", response=list[str], auth=auth)
+@follow_router.get(
+    "/followers/{user_id}/", response=list[str], auth=auth, deprecated=True
+)
 def list_followers(request: HttpRequest, user_id: str) -> list[str]:
     target = User.objects.filter(id=user_id).first()
     if not target:
@@ -47,7 +152,9 @@ def list_followers(request: HttpRequest, user_id: str) -> list[str]:
     return list(map(str, followers))
 
 
-@follow_router.get("/following/{user_id}/", response=list[str], auth=auth)
+@follow_router.get(
+    "/following/{user_id}/", response=list[str], auth=auth, deprecated=True
+)
 def list_following(request: HttpRequest, user_id: str) -> list[str]:
     target = User.objects.filter(id=user_id).first()
     if not target:
@@ -56,3 +163,27 @@ def list_following(request: HttpRequest, user_id: str) -> list[str]:
         "following__id", flat=True
     )
     return list(map(str, following))
+
+
+@follow_router.get(
+    "/followers/{user_id}/page/", response=FollowPageSchema, auth=auth
+)
+def list_followers_page(
+    request: HttpRequest,
+    user_id: str,
+    count: int = 20,
+    cursor: str | None = None,
+):
+    return _follow_page(user_id, "follower", count, cursor)
+
+
+@follow_router.get(
+    "/following/{user_id}/page/", response=FollowPageSchema, auth=auth
+)
+def list_following_page(
+    request: HttpRequest,
+    user_id: str,
+    count: int = 20,
+    cursor: str | None = None,
+):
+    return _follow_page(user_id, "following", count, cursor)
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from itertools import islice
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import connection
+from django.http import HttpRequest
+
+from project.env import ENV
+from users.auth import JWTAuth
+from users.auth import create_access_token
+from users.auth import token_cache
+from users.cache import user_cache
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Measure JWTAuth.authenticate under concurrent load"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=4000)
+        parser.add_argument("--users", type=int, default=50)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        tokens = [
+            create_access_token(sub=str(user_id))
+            for user_id in User.objects.values_list("id", flat=True)[
+                : options["users"]
+            ]
+        ]
+        if not tokens:
+            self.stderr.write("No users to authenticate as")
+            return
+
+        configured = ENV.USER_CACHE_BACKEND
+        user_backend = configured if configured != "off" else "local"
+        token_cache_size = token_cache.maxsize
+        runs = [
+            ("no caches", "off", 0),
+            ("user cache", user_backend, 0),
+            ("user + token cache", user_backend, token_cache_size or 10000),
+        ]
+        try:
+            for label, backend, size in runs:
+                user_cache.backend = backend
+                user_cache.clear()
+                token_cache.maxsize = size
+                token_cache.clear()
+                elapsed = self._run(
+                    tokens, options["threads"], options["requests"]
+                )
+                self.stdout.write(
+                    f"{label:>18}:"
+                    f" {elapsed / options['requests'] * 1e6:8.1f} us/request,"
+                    f" {options['requests'] / elapsed:8.0f} requests/s"
+                )
+        finally:
+            user_cache.backend = configured
+            token_cache.maxsize = token_cache_size
+
+    def _run(self, tokens: list[str], threads: int, requests: int) -> float:
+        auth = JWTAuth()
+        per_thread = max(requests // threads, 1)
+
+        def worker(offset: int) -> None:
+            try:
+                for token in islice(
+                    cycle(tokens[offset:] + tokens[:offset]), per_thread
+                ):
+                    auth.authenticate(HttpRequest(), token)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(worker, range(threads)))
+        return time.perf_counter() - start
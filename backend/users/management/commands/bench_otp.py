@@ -0,0 +1,57 @@
+import random
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from users.models import OTP
+
+BENCH_PREFIX = "bench-otp-"
+
+
+class Command(BaseCommand):
+    help = "Measure the verify_otp lookup as the OTP table grows"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--sizes",
+            type=lambda value: [int(size) for size in value.split(",")],
+            default=[10_000, 100_000, 1_000_000],
+            help="Comma separated table sizes to measure at",
+        )
+        parser.add_argument("--lookups", type=int, default=500)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        rows = 0
+        try:
+            for size in sorted(options["sizes"]):
+                while rows < size:
+                    count = min(options["batch_size"], size - rows)
+                    OTP.objects.bulk_create(
+                        [
+                            OTP(
+                                identifier=f"{BENCH_PREFIX}{rows + i}",
+                                code=f"{(rows + i) % 1_000_000:06d}",
+                            )
+                            for i in range(count)
+                        ],
+                        batch_size=options["batch_size"],
+                    )
+                    rows += count
+                self._measure(rows, options["lookups"])
+        finally:
+            OTP.objects.filter(identifier__startswith=BENCH_PREFIX).delete()
+
+    def _measure(self, rows: int, lookups: int) -> None:
+        samples = [random.randrange(rows) for _ in range(lookups)]
+        start = time.perf_counter()
+        for n in samples:
+            OTP.objects.filter(
+                identifier=f"{BENCH_PREFIX}{n}", code=f"{n % 1_000_000:06d}"
+            ).latest("created_at")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{rows:>10} rows: {elapsed / lookups * 1e6:8.1f} us/lookup"
+        )
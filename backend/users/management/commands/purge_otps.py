@@ -0,0 +1,19 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from users.models import OTP
+
+
+class Command(BaseCommand):
+    help = "Delete expired one-time passwords in chunks"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        purged = OTP.objects.purge_expired(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {purged} expired OTP(s)")
+        )
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('content', 'Follow')
+    Post = apps.get_model('content', 'Post')
+    counters = {
+        'followers_count': (Follow, 'following'),
+        'following_count': (Follow, 'follower'),
+        'posts_count': (Post, 'author'),
+    }
+    User.objects.update(**{
+        field: Coalesce(
+            Subquery(
+                model.objects.filter(**{fk: OuterRef('pk')})
+                .order_by()
+                .values(fk)
+                .annotate(total=Count('*'))
+                .values('total')
+            ),
+            Value(0),
+            output_field=IntegerField(),
+        )
+        for field, (model, fk) in counters.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0012_post_hot_score'),
+        ('users', '0005_user_gender'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
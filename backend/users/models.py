@@ -3,6 +3,7 @@ from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
 from secrets import token_urlsafe
+from typing import Iterable
 from typing import Literal
 
 from django.contrib.auth.models import AbstractBaseUser
@@ -13,6 +14,8 @@ from django.db.models.expressions import Combinable
 
 from project.env import ENV
 
+OTP_TTL = timedelta(minutes=ENV.OTP_TTL_MINUTES)
+
 
 class UserManager(BaseUserManager["User"]):
     def create_user(self, email: str | None = None, phone: str | None = None):
@@ -32,10 +35,26 @@ class UserManager(BaseUserManager["User"]):
         return user
 
 
+class ThemeManager(models.Manager["Theme"]):
+    def resolve(self, names: Iterable[str]) -> list["Theme"]:
+        """Fetch themes by name in order, creating the missing ones in bulk."""
+        names = list(dict.fromkeys(names))
+        themes = {t.name: t for t in self.filter(name__in=names)}
+        missing = [name for name in names if name not in themes]
+        if missing:
+            self.bulk_create(
+                [self.model(name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            themes.update({t.name: t for t in self.filter(name__in=missing)})
+        return [themes[name] for name in names]
+
+
 class Theme(models.Model):
     name: models.CharField[str, str] = models.CharField(
         max_length=50, unique=True, db_index=True
     )
+    objects = ThemeManager()
 
     def __str__(self):
         return self.name
@@ -103,6 +122,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     themes: models.ManyToManyField[Theme, Theme] = models.ManyToManyField(
         Theme, blank=True, related_name="users"
     )
+    followers_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0, db_index=True)
+    )
+    following_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
+    posts_count: models.PositiveIntegerField[int, int] = (
+        models.PositiveIntegerField(default=0)
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -112,17 +140,38 @@ class User(AbstractBaseUser, PermissionsMixin):
         return f"{self.email or self.phone}"
 
 
+class OTPManager(models.Manager["OTP"]):
+    def purge_expired(self, batch_size: int = 10000) -> int:
+        """Delete expired codes in bounded chunks to keep locks short."""
+        cutoff = datetime.now(timezone.utc) - OTP_TTL
+        purged = 0
+        while True:
+            ids = list(
+                self.filter(created_at__lt=cutoff).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                return purged
+            purged += self.filter(id__in=ids).delete()[0]
+
+
 class OTP(models.Model):
     identifier: models.CharField[str, str] = models.CharField(max_length=255)
     code: models.CharField[str, str] = models.CharField(max_length=6)
     created_at: models.DateTimeField[
         datetime, datetime
     ] = models.DateTimeField(auto_now_add=True)
+    objects = OTPManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["identifier", "code", "-created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
 
     def is_expired(self):
-        return datetime.now(timezone.utc) > self.created_at + timedelta(
-            minutes=5
-        )
+        return datetime.now(timezone.utc) > self.created_at + OTP_TTL
 
     @staticmethod
     def generate_code():
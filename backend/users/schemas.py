@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime
 
 from ninja import ModelSchema, Schema
 from users.models import Theme
@@ -27,6 +28,31 @@ class ProfileSchema(Schema):
     is_following: bool = False
 
 
+class FollowUserSchema(Schema):
+    id: uuid.UUID
+    username: str | None = None
+    full_name: str | None = None
+    profile_picture: str | None = None
+    followed_at: datetime
+
+
+class FollowPageSchema(Schema):
+    users: list[FollowUserSchema]
+    total: int
+    next_cursor: str | None = None
+
+
+class SimilarUserSchema(Schema):
+    id: uuid.UUID
+    username: str | None = None
+    full_name: str | None = None
+    profile_picture: str | None = None
+    body_type: str | None = None
+    height: float | None = None
+    weight: float | None = None
+    gender: str | None = None
+
+
 class UpdateProfileSchema(Schema):
     username: str | None = None
     full_name: str | None = None
@@ -0,0 +1,230 @@
+import heapq
+import math
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Container
+from typing import Iterator
+from uuid import UUID
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.metrics import metrics
+from core.snapshot import JournaledSnapshot
+from project.env import ENV
+from users.models import User
+
+# grid cell size; keeps the 30 cm : 15 kg ratio of the For You feed's
+# similarity tolerances so distance weighs both the same way
+SIMILAR_HEIGHT_CELL = 1.0
+SIMILAR_WEIGHT_CELL = 0.5
+BODY_PROFILE_FIELDS = frozenset({"gender", "body_type", "height", "weight"})
+
+Partition = tuple[str, str | None]
+Cell = tuple[int, int]
+BodyProfile = tuple[Partition, float, float]
+
+
+@dataclass
+class Grid:
+    cells: dict[Cell, dict[UUID, tuple[float, float]]] = field(
+        default_factory=dict
+    )
+    # bounds only grow until the next rebuild
+    min_x: int = 0
+    max_x: int = -1
+    min_y: int = 0
+    max_y: int = -1
+
+    def add(self, cell: Cell, user_id: UUID, x: float, y: float) -> None:
+        if not self.cells:
+            self.min_x, self.min_y = self.max_x, self.max_y = cell
+        else:
+            self.min_x = min(self.min_x, cell[0])
+            self.max_x = max(self.max_x, cell[0])
+            self.min_y = min(self.min_y, cell[1])
+            self.max_y = max(self.max_y, cell[1])
+        self.cells.setdefault(cell, {})[user_id] = (x, y)
+
+    def remove(self, cell: Cell, user_id: UUID) -> None:
+        del self.cells[cell][user_id]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def covered(self, cx: int, cy: int, ring: int) -> bool:
+        return (
+            cx - ring <= self.min_x
+            and cx + ring >= self.max_x
+            and cy - ring <= self.min_y
+            and cy + ring >= self.max_y
+        )
+
+    def ring(self, cx: int, cy: int, ring: int) -> Iterator[Cell]:
+        """Cells at Chebyshev distance ``ring`` that lie inside the bounds."""
+        if ring == 0:
+            yield cx, cy
+            return
+        x0, x1 = max(cx - ring, self.min_x), min(cx + ring, self.max_x)
+        for y in (cy - ring, cy + ring):
+            if self.min_y <= y <= self.max_y:
+                for x in range(x0, x1 + 1):
+                    yield x, y
+        y0, y1 = max(cy - ring + 1, self.min_y), min(cy + ring - 1, self.max_y)
+        for x in (cx - ring, cx + ring):
+            if self.min_x <= x <= self.max_x:
+                for y in range(y0, y1 + 1):
+                    yield x, y
+
+
+Grids = dict[Partition, Grid]
+Entries = dict[UUID, tuple[Partition, Cell]]
+Index = tuple[Grids, Entries]
+
+
+def body_profile(
+    gender: str,
+    body_type: str | None,
+    height: Any,
+    weight: Any,
+) -> BodyProfile | None:
+    if height is None or weight is None:
+        return None
+    return (
+        (gender, body_type),
+        float(height) / SIMILAR_HEIGHT_CELL,
+        float(weight) / SIMILAR_WEIGHT_CELL,
+    )
+
+
+class BodyProfileIndex(JournaledSnapshot[Index]):
+    """Nearest users by (height, weight) within a gender and body type.
+
+    Each partition is a uniform grid over scaled height and weight, so a
+    lookup scans rings of cells outward from the viewer and stops once no
+    unvisited cell can hold anything closer. Profile saves move users in
+    place; a background rebuild every SIMILAR_USERS_REFRESH_SECONDS picks
+    up changes made by other workers.
+    """
+
+    thread_name = "Similar users rebuild"
+
+    @staticmethod
+    def _place(
+        grids: Grids,
+        entries: Entries,
+        user_id: UUID,
+        profile: BodyProfile | None,
+    ) -> None:
+        if previous := entries.pop(user_id, None):
+            partition, cell = previous
+            grids[partition].remove(cell, user_id)
+        if profile is None:
+            return
+        partition, x, y = profile
+        cell = (math.floor(x), math.floor(y))
+        grids.setdefault(partition, Grid()).add(cell, user_id, x, y)
+        entries[user_id] = (partition, cell)
+
+    def build(self) -> Index:
+        grids: Grids = {}
+        entries: Entries = {}
+        with metrics.timer("users.similar_rebuild"):
+            for user_id, *fields in (
+                User.objects.filter(height__isnull=False, weight__isnull=False)
+                .values_list("id", "gender", "body_type", "height", "weight")
+                .iterator(chunk_size=10000)
+            ):
+                self._place(grids, entries, user_id, body_profile(*fields))
+        metrics.set_gauge("users.similar_indexed", len(entries))
+        return grids, entries
+
+    def apply(
+        self, value: Index, change: tuple[UUID, BodyProfile | None]
+    ) -> None:
+        self._place(*value, *change)
+
+    def update(self, user_id: UUID, profile: BodyProfile | None) -> None:
+        self.changed((user_id, profile))
+
+    def _nearest(
+        self,
+        grid: Grid | None,
+        x: float,
+        y: float,
+        count: int,
+        exclude: Container[UUID],
+    ) -> list[tuple[float, UUID]]:
+        if grid is None or not grid.cells:
+            return []
+        cx, cy = math.floor(x), math.floor(y)
+        # max-heap of the best ``count`` so far, as (-distance², user id)
+        best: list[tuple[float, UUID]] = []
+        ring = 0
+        while True:
+            for cell in grid.ring(cx, cy, ring):
+                members = grid.cells.get(cell)
+                if members is None:
+                    continue
+                for user_id, (ux, uy) in members.items():
+                    if user_id in exclude:
+                        continue
+                    item = (-((ux - x) ** 2 + (uy - y) ** 2), user_id)
+                    if len(best) < count:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+            # every point beyond this ring is at least ``ring`` cells away
+            if len(best) == count and -best[0][0] <= ring**2:
+                break
+            if grid.covered(cx, cy, ring):
+                break
+            ring += 1
+        return sorted((-d, user_id) for d, user_id in best)
+
+    def similar(
+        self, user: User, count: int, exclude: Container[UUID] = ()
+    ) -> list[UUID]:
+        """Closest users of the same gender, preferring the same body type."""
+        profile = body_profile(
+            user.gender, user.body_type, user.height, user.weight
+        )
+        if profile is None:
+            return []
+        grids, _ = self.snapshot()
+        (gender, body_type), x, y = profile
+        # profile saves move users around the grids in place
+        with self._lock:
+            results = self._nearest(
+                grids.get((gender, body_type)), x, y, count, exclude
+            )
+            if len(results) < count:
+                others: list[tuple[float, UUID]] = []
+                for (other_gender, other_type), grid in grids.items():
+                    if other_gender == gender and other_type != body_type:
+                        others += self._nearest(
+                            grid, x, y, count - len(results), exclude
+                        )
+                results += sorted(others)[: count - len(results)]
+        return [user_id for _, user_id in results]
+
+
+similar_users = BodyProfileIndex(ttl=ENV.SIMILAR_USERS_REFRESH_SECONDS)
+
+
+@receiver(post_save, sender=User)
+def _user_saved(sender: type[User], instance: User, **kwargs: Any):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and not BODY_PROFILE_FIELDS & update_fields:
+        return
+    profile = body_profile(
+        instance.gender, instance.body_type, instance.height, instance.weight
+    )
+    transaction.on_commit(lambda: similar_users.update(instance.pk, profile))
+
+
+@receiver(post_delete, sender=User)
+def _user_deleted(sender: type[User], instance: User, **kwargs: Any):
+    transaction.on_commit(lambda: similar_users.update(instance.pk, None))
@@ -0,0 +1,20 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from core.outbox import email_outbox
+from users.models import OTP
+
+
+class RequestOTPTests(TestCase):
+    def test_full_outbox_returns_503(self) -> None:
+        with mock.patch.object(email_outbox, "max_pending", 0):
+            response = self.client.post(
+                "/api/auth/request-otp",
+                {"email": "a@example.com"},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Too many pending emails", response.json()["error"])
+        # the OTP is rolled back with the email that could not be queued
+        self.assertFalse(OTP.objects.exists())